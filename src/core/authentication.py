@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+USER_KEY = 'core:user:{}'
+
+# The user fields cached for ClaimsUser. The password hash stays out of the
+# shared cache.
+USER_FIELDS = ['username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser']
+
+
+def get_user_fields(user_id):
+    # USER_FIELDS of the user row, cached for CORE_USER_CACHE_TIMEOUT.
+    # core.signals drops them when the user is saved or deleted.
+    key = USER_KEY.format(user_id)
+    fields = cache.get(key)
+    if fields is None:
+        fields = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*USER_FIELDS).first()
+        if fields is None:
+            raise get_user_model().DoesNotExist
+        cache.set(key, fields, timeout=settings.CORE_USER_CACHE_TIMEOUT)
+    return fields
+
+
+def forget_user_fields(user_id):
+    cache.delete(USER_KEY.format(user_id))
+
+
+class ClaimsUser(TokenUser):
+    # request.user built from the claims of the access token (see
+    # core.tokens): id, is_staff and customer_id. USER_FIELDS, like username
+    # and is_superuser, are read from the cache, and any other attribute,
+    # groups and permissions from the user row, loaded on first use.
+
+    @cached_property
+    def customer_id(self):
+        return self.token.get('customer_id')
+
+    @cached_property
+    def is_staff(self):
+        if 'is_staff' in self.token:
+            return self.token['is_staff']
+        return self.fields['is_staff']
+
+    @cached_property
+    def username(self):
+        return self.fields['username']
+
+    @cached_property
+    def is_superuser(self):
+        return self.fields['is_superuser']
+
+    # TokenUser has no groups or permissions, these are the user's.
+    @property
+    def groups(self):
+        return self.user.groups
+
+    @property
+    def user_permissions(self):
+        return self.user.user_permissions
+
+    def get_group_permissions(self, obj=None):
+        return self.user.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None):
+        return self.user.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None):
+        return self.user.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self.user.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self.user.has_module_perms(module)
+
+    def __str__(self):
+        return self.username
+
+    @cached_property
+    def fields(self):
+        return get_user_fields(self.id)
+
+    @cached_property
+    def user(self):
+        return get_user_model().objects.get(**{api_settings.USER_ID_FIELD: self.id})
+
+    def __getattr__(self, attr):
+        if attr == 'token' or attr.startswith('_'):
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        if attr in USER_FIELDS:
+            return self.fields[attr]
+        return getattr(self.user, attr)
+
+
+class JWTClaimsAuthentication(JWTAuthentication):
+    # No user query at all: request.user is a ClaimsUser. Tokens issued
+    # without the claims get their flags from the cached fields. A
+    # deactivated user keeps access until their access token expires
+    # (ACCESS_TOKEN_LIFETIME).
+    #
+    # Views saving the user, like djoser's, use JWTAuthentication and the
+    # current row instead.
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = ClaimsUser(validated_token)
+        if 'is_staff' not in validated_token:
+            try:
+                fields = user.fields
+            except get_user_model().DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            if api_settings.CHECK_USER_IS_ACTIVE and not fields['is_active']:
+                raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
@@ -0,0 +1,108 @@
+import logging
+import random
+import time
+
+import requests
+from django.core.cache import cache
+from kombu.exceptions import OperationalError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+# Entries are namespaced, so a key that held a bare value before, like
+# say_hello's 'httpbin_result', is never read back in the old format.
+ENTRY_KEY = 'fetch:{}'
+LOCK_KEY = 'fetch:{}:lock'
+
+# Longest a fetch may hold the lock before another process takes over.
+LOCK_TIMEOUT = 30
+
+# How long a cold miss waits for another process's fetch to land.
+WAIT_TIMEOUT = 10
+
+WAIT_INTERVAL = 0.05
+
+# TTLs are spread by +/- 10% so that keys set together do not expire together.
+JITTER = 0.1
+
+_session = None
+
+
+class FetchTimeout(Exception):
+    # A cold miss waited WAIT_TIMEOUT for another process's fetch.
+    pass
+
+
+def get_session():
+    # One pooled session per process, created lazily so that forked
+    # workers do not share sockets.
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], allowed_methods=['GET']),
+        )
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+    return _session
+
+
+def jitter(seconds):
+    return seconds * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def fetch(key, url, ttl, stale_ttl, timeout):
+    response = get_session().get(url, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+
+    ttl = jitter(ttl)
+    cache.set(ENTRY_KEY.format(key), {'data': data, 'fresh_until': time.time() + ttl}, timeout=ttl + stale_ttl)
+    return data
+
+
+def cached_fetch(key, url, ttl=60, stale_ttl=300, timeout=5):
+    # Returns the JSON body of `url`, cached under `key`.
+    # - Fresh for `ttl` seconds, then served stale for up to `stale_ttl`
+    #   more while a Celery task refreshes it in the background.
+    # - One process at a time fetches a key: the lock is a cache.add(),
+    #   which is SET NX on Redis. On a cold miss, the others wait for it,
+    #   and raise FetchTimeout after WAIT_TIMEOUT rather than fetch
+    #   without the lock.
+    lock_key = LOCK_KEY.format(key)
+    entry = cache.get(ENTRY_KEY.format(key))
+
+    if entry is not None:
+        if entry['fresh_until'] <= time.time() and cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            from .tasks import refresh_cached_fetch
+
+            try:
+                refresh_cached_fetch.delay(key, url, ttl, stale_ttl, timeout)
+            except OperationalError:
+                logger.warning('Could not queue the refresh of %s', key, exc_info=True)
+                cache.delete(lock_key)
+        return entry['data']
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while True:
+        # If the fetch holding the lock fails, or its lock expires, a single
+        # waiter takes over.
+        if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            try:
+                entry = cache.get(ENTRY_KEY.format(key))
+                if entry is not None:
+                    return entry['data']
+                return fetch(key, url, ttl, stale_ttl, timeout)
+            finally:
+                cache.delete(lock_key)
+
+        if time.monotonic() >= deadline:
+            raise FetchTimeout(key)
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(ENTRY_KEY.format(key))
+        if entry is not None:
+            return entry['data']
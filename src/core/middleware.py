@@ -0,0 +1,178 @@
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+# IN (%s, %s, %s) lists vary with the number of ids, they count as one shape.
+PLACEHOLDER_LIST = re.compile(r'%s(?:, %s)+')
+
+
+def get_fingerprint(sql):
+    return PLACEHOLDER_LIST.sub('%s, ...', sql)
+
+
+class QueryStats:
+    # An execute_wrapper counting the queries of one request. Statements are
+    # grouped by their SQL text, which Django parameterizes, and only turned
+    # into fingerprints once the response is ready.
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # SQL: [count, duration, alias, params of the first execution]
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            statement = self.statements.get(sql)
+            if statement is None:
+                self.statements[sql] = [1, duration, context['connection'].alias, None if many else params]
+            else:
+                statement[0] += 1
+                statement[1] += duration
+
+    def get_fingerprints(self):
+        # Sorted by total time, slowest first.
+        fingerprints = {}
+        for sql, (count, duration, alias, params) in self.statements.items():
+            fingerprint = fingerprints.setdefault(get_fingerprint(sql), {
+                'sql': get_fingerprint(sql), 'count': 0, 'duration': 0.0, 'sample': (alias, sql, params),
+            })
+            fingerprint['count'] += count
+            fingerprint['duration'] += duration
+        return sorted(fingerprints.values(), key=lambda fingerprint: fingerprint['duration'], reverse=True)
+
+
+def explain(alias, sql, params):
+    if params is None or not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    connection = connections[alias]
+    if connection.needs_rollback or not connection.features.supports_explaining_query_execution:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+    except DatabaseError:
+        return None
+
+
+def instrument(stats):
+    # Wraps this thread's connections until the returned stack is closed.
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(stats))
+    return stack
+
+
+class QueryInstrumentationMiddleware:
+    # Counts the queries and database time of each request. With
+    # QUERY_SERVER_TIMING set, they are reported in a Server-Timing header,
+    # which browsers show in their dev tools:
+    #   Server-Timing: db;dur=12.40;desc="7 queries", app;dur=31.02
+    # Slow requests, and requests repeating a query shape at least
+    # QUERY_REPEAT_THRESHOLD times (an N+1), are logged with their top
+    # fingerprints, and with EXPLAIN plans if QUERY_LOG_EXPLAIN is set.
+    #
+    # The wrapper only times and counts each query, fingerprints are built
+    # for the requests that get logged.
+    #
+    # Connections are thread-local. Under ASGI, the ORM calls of a request
+    # run through sync_to_async on one thread per request, so async requests
+    # install and remove the wrappers, and log, on that thread.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        start = time.perf_counter()
+        with instrument(stats):
+            response = self.get_response(request)
+        return self.process_response(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        stack = await sync_to_async(instrument)(stats)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            await sync_to_async(stack.close)()
+            raise
+        duration = time.perf_counter() - start
+        # Logging may run EXPLAIN, on the same thread as the request's queries.
+        return await sync_to_async(self.close)(stack, request, response, stats, duration)
+
+    def close(self, stack, request, response, stats, duration):
+        stack.close()
+        return self.process_response(request, response, stats, duration)
+
+    def process_response(self, request, response, stats, duration):
+        if settings.QUERY_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries", '
+                f'app;dur={(duration - stats.duration) * 1000:.2f}'
+            )
+        if stats.count:
+            self.log(request, response, stats, duration)
+        return response
+
+    def log(self, request, response, stats, duration):
+        slow = duration * 1000 >= settings.QUERY_SLOW_REQUEST_MS
+        repeated = max(count for count, *_ in stats.statements.values()) >= settings.QUERY_REPEAT_THRESHOLD
+        if not slow and not repeated:
+            return
+
+        fingerprints = stats.get_fingerprints()
+        if not slow:
+            fingerprints = [
+                fingerprint for fingerprint in fingerprints
+                if fingerprint['count'] >= settings.QUERY_REPEAT_THRESHOLD
+            ]
+        top_queries = []
+        for fingerprint in fingerprints[:settings.QUERY_LOG_TOP]:
+            query = {
+                'sql': fingerprint['sql'],
+                'count': fingerprint['count'],
+                'duration_ms': round(fingerprint['duration'] * 1000, 2),
+            }
+            if settings.QUERY_LOG_EXPLAIN:
+                query['explain'] = explain(*fingerprint['sample'])
+            top_queries.append(query)
+
+        # The fields are passed as extra, for a JSON log formatter.
+        stats_record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_duration_ms': round(stats.duration * 1000, 2),
+            'queries': stats.count,
+            'top_queries': top_queries,
+        }
+        logger.warning(
+            '%s %s %s: %s queries, %.2f ms',
+            'Slow request' if slow else 'Repeated queries in',
+            request.method, request.path, stats.count, duration * 1000,
+            extra={'request_stats': stats_record},
+        )
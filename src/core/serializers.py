@@ -1,4 +1,14 @@
+from django.db.models import Manager
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer, UserSerializer as BaseUserSerializer
+from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as BaseTokenObtainPairSerializer, TokenRefreshSerializer as BaseTokenRefreshSerializer
+
+from store.models import Product
+from store.serializers import ProductSerializer
+from tags.models import TaggedItem
+from tags.serializers import TagSerializer
+
+from .tokens import RefreshToken
 
 class UserCreateSerializer(BaseUserCreateSerializer):
     class Meta(BaseUserCreateSerializer.Meta):
@@ -6,4 +16,39 @@ class UserCreateSerializer(BaseUserCreateSerializer):
 
 class UserSerializer(BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
-        fields = ['id', 'username', 'email', 'first_name', 'last_name']
\ No newline at end of file
+        fields = ['id', 'username', 'email', 'first_name', 'last_name']
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    token_class = RefreshToken
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
+
+class TaggedProductListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        products = list(data.all() if isinstance(data, Manager) else data)
+        if 'tags' in self.child.fields:
+            # One query for the tags of the whole page.
+            self.child.loaded_tags = TaggedItem.objects.get_tags_for_many(
+                Product, [product.id for product in products])
+        return super().to_representation(products)
+
+class TaggedProductSerializer(ProductSerializer):
+    # The store's products with their tags, set as STORE_PRODUCT_SERIALIZER.
+    # Only with ?expand=tags.
+    tags = serializers.SerializerMethodField()
+
+    cache_dependencies = ProductSerializer.cache_dependencies + ['tag', 'taggeditem']
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['tags']
+        expandable_fields = ProductSerializer.Meta.expandable_fields + ['tags']
+        list_serializer_class = TaggedProductListSerializer
+
+    def get_tags(self, product: Product):
+        loaded_tags = getattr(self, 'loaded_tags', {})
+        if product.id in loaded_tags:
+            tags = loaded_tags[product.id]
+        else:
+            tags = TaggedItem.objects.get_tags_for_many(Product, [product.id])[product.id]
+        return TagSerializer(tags, many=True).data
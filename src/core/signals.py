@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from store.cache import invalidate
+from tags.models import Tag, TaggedItem
+
+from .authentication import forget_user_fields
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def forget_changed_user(sender, instance, **kwargs):
+    forget_user_fields(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=TaggedItem)
+def invalidate_tagged_products(sender, **kwargs):
+    # Cached product responses embed tags, see TaggedProductSerializer.
+    invalidate(sender._meta.model_name)
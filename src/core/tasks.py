@@ -0,0 +1,22 @@
+import logging
+
+from celery import shared_task
+from django.core.cache import cache
+from requests import RequestException
+
+from .fetch import LOCK_KEY, fetch
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_cached_fetch(key, url, ttl, stale_ttl, timeout):
+    # Queued by core.fetch.cached_fetch, which took the lock. On failure the
+    # stale value stays in place until the next attempt.
+    try:
+        fetch(key, url, ttl, stale_ttl, timeout)
+    except (RequestException, ValueError):
+        logger.warning('Could not refresh %s from %s', key, url, exc_info=True)
+    finally:
+        cache.delete(LOCK_KEY.format(key))
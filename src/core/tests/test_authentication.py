@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+import pytest
+
+from core.authentication import USER_KEY, ClaimsUser
+from core.tokens import RefreshToken
+
+
+@pytest.fixture
+def user():
+    cache.clear()
+    user = get_user_model().objects.create(username='a', email='a@example.com')
+    user.set_password('secret-password')
+    user.save()
+    return user
+
+
+def client_for(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+    return client
+
+
+def user_queries(context):
+    return [query for query in context.captured_queries if 'FROM "core_user"' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestClaimsAuthentication:
+    def test_login_issues_claims(self, user):
+        response = APIClient().post('/auth/jwt/create/', {'username': 'a', 'password': 'secret-password'})
+
+        token = AccessToken(response.data['access'])
+        assert token['is_staff'] is False
+        assert token['customer_id'] == user.customer.id
+
+    def test_authenticated_requests_do_not_load_the_user(self, user):
+        client = client_for(RefreshToken.for_user(user).access_token)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/store/orders/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not user_queries(context)
+        assert not any('FROM "store_customer"' in query['sql'] for query in context.captured_queries)
+
+    def test_other_attributes_come_from_the_user_row(self, user):
+        token = AccessToken(str(RefreshToken.for_user(user).access_token))
+
+        assert ClaimsUser(token).email == 'a@example.com'
+
+    def test_superusers_keep_their_permissions(self, user):
+        user.is_superuser = True
+        user.save()
+        claims_user = ClaimsUser(AccessToken(str(RefreshToken.for_user(user).access_token)))
+
+        assert (claims_user.username, str(claims_user)) == ('a', 'a')
+        assert claims_user.is_superuser is True
+        assert claims_user.has_perm('store.change_product')
+        assert claims_user.has_module_perms('store')
+
+    def test_permissions_come_from_the_user(self, user):
+        user.user_permissions.add(Permission.objects.get(codename='view_order'))
+        claims_user = ClaimsUser(AccessToken(str(RefreshToken.for_user(user).access_token)))
+
+        assert claims_user.is_superuser is False
+        assert claims_user.has_perms(['store.view_order'])
+        assert not claims_user.has_perm('store.change_order')
+        assert claims_user.get_all_permissions() == {'store.view_order'}
+        assert list(claims_user.user_permissions.values_list('codename', flat=True)) == ['view_order']
+        assert not claims_user.groups.exists()
+
+    def test_tokens_without_claims_load_the_user_once(self, user):
+        client = client_for(AccessToken.for_user(user))
+        client.get('/store/orders/')
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/store/orders/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not user_queries(context)
+
+    def test_the_password_is_not_cached(self, user):
+        client_for(AccessToken.for_user(user)).get('/store/orders/')
+
+        fields = cache.get(USER_KEY.format(user.id))
+        assert fields['username'] == 'a'
+        assert 'password' not in fields
+
+    def test_refresh_reads_the_current_claims(self, user):
+        refresh = RefreshToken.for_user(user)
+        user.is_staff = True
+        user.save()
+
+        response = APIClient().post('/auth/jwt/refresh/', {'refresh': str(refresh)})
+
+        assert AccessToken(response.data['access'])['is_staff'] is True
+
+    def test_current_user_can_be_updated(self, user):
+        client = client_for(RefreshToken.for_user(user).access_token)
+        client.get('/auth/users/me/')
+
+        client.patch('/auth/users/me/', {'first_name': 'b'})
+        response = client.get('/auth/users/me/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['first_name'] == 'b'
+
+    def test_current_user_is_saved_from_the_current_row(self, user):
+        client = client_for(RefreshToken.for_user(user).access_token)
+        client.get('/auth/users/me/')
+        # Changed without signals, so nothing cached is dropped.
+        get_user_model().objects.filter(pk=user.pk).update(last_name='c')
+
+        client.patch('/auth/users/me/', {'first_name': 'b'})
+
+        user.refresh_from_db()
+        assert (user.first_name, user.last_name) == ('b', 'c')
+
+    def test_auth_keeps_the_api_root_and_format_suffixes(self, user):
+        client = client_for(RefreshToken.for_user(user).access_token)
+
+        assert client.get('/auth/').data['users'].endswith('/auth/users/')
+        assert client.get('/auth/users/me.json').data['username'] == 'a'
@@ -0,0 +1,104 @@
+import logging
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+import pytest
+
+from core.middleware import QueryInstrumentationMiddleware, get_fingerprint
+from store.models import Collection, Product
+
+
+def n_plus_one(request):
+    # One query per collection, then one for all of them.
+    for collection in Collection.objects.all():
+        list(Product.objects.filter(collection_id=collection.id))
+    list(Product.objects.filter(collection_id__in=[1, 2, 3]))
+    return HttpResponse()
+
+
+async def count_collections(request):
+    await Collection.objects.acount()
+    return HttpResponse()
+
+
+@pytest.fixture
+def collections():
+    return [Collection.objects.create(title=str(index)) for index in range(3)]
+
+
+def get_request_stats(caplog):
+    [record] = [record for record in caplog.records if record.name == 'core.middleware']
+    return record.request_stats
+
+
+@pytest.mark.django_db
+class TestQueryInstrumentation:
+    def test_adds_server_timing_to_api_responses(self, collections, settings):
+        settings.QUERY_SERVER_TIMING = True
+        response = APIClient().get('/store/products/')
+
+        assert response['Server-Timing'].startswith('db;dur=')
+        assert 'desc="2 queries"' in response['Server-Timing']
+
+    def test_server_timing_is_off_by_default(self, collections):
+        response = APIClient().get('/store/products/')
+
+        assert 'Server-Timing' not in response
+
+    def test_counts_the_queries_of_async_views(self, collections, settings):
+        settings.QUERY_SERVER_TIMING = True
+        middleware = QueryInstrumentationMiddleware(count_collections)
+
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+
+        assert iscoroutinefunction(middleware)
+        assert 'desc="1 queries"' in response['Server-Timing']
+
+    def test_explains_the_queries_of_async_views(self, collections, settings, caplog):
+        settings.QUERY_SLOW_REQUEST_MS = 0
+        settings.QUERY_LOG_EXPLAIN = True
+        middleware = QueryInstrumentationMiddleware(count_collections)
+
+        with caplog.at_level(logging.WARNING, logger='core.middleware'):
+            async_to_sync(middleware)(RequestFactory().get('/'))
+
+        [query] = get_request_stats(caplog)['top_queries']
+        assert query['explain']
+
+    def test_logs_repeated_queries(self, collections, settings, caplog):
+        settings.QUERY_REPEAT_THRESHOLD = 3
+        middleware = QueryInstrumentationMiddleware(n_plus_one)
+
+        with caplog.at_level(logging.WARNING, logger='core.middleware'):
+            middleware(RequestFactory().get('/'))
+
+        stats = get_request_stats(caplog)
+        assert stats['queries'] == 5
+        [query] = stats['top_queries']
+        assert query['count'] == 3
+        assert 'explain' not in query
+
+    def test_logs_slow_requests_with_their_plans(self, collections, settings, caplog):
+        settings.QUERY_SLOW_REQUEST_MS = 0
+        settings.QUERY_LOG_EXPLAIN = True
+        middleware = QueryInstrumentationMiddleware(n_plus_one)
+
+        with caplog.at_level(logging.WARNING, logger='core.middleware'):
+            middleware(RequestFactory().get('/'))
+
+        stats = get_request_stats(caplog)
+        assert sum(query['count'] for query in stats['top_queries']) == 5
+        assert all(query['explain'] for query in stats['top_queries'])
+
+    def test_fast_requests_are_not_logged(self, collections, caplog):
+        with caplog.at_level(logging.WARNING, logger='core.middleware'):
+            QueryInstrumentationMiddleware(n_plus_one)(RequestFactory().get('/'))
+
+        assert not caplog.records
+
+
+class TestFingerprint:
+    def test_in_lists_of_any_length_share_a_fingerprint(self):
+        assert get_fingerprint('WHERE id IN (%s, %s)') == get_fingerprint('WHERE id IN (%s, %s, %s)')
@@ -0,0 +1,25 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+import msgpack
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+
+DATA = {
+    'price': Decimal('11.90'),
+    'placed_at': datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    'label': gettext_lazy('Hello'),
+    'items': [{'id': 1, 'unit_price': '10.00'}],
+}
+
+
+class TestRenderers:
+    def test_orjson_output_matches_the_stock_renderer(self):
+        assert json.loads(ORJSONRenderer().render(DATA)) == json.loads(JSONRenderer().render(DATA))
+
+    def test_messagepack_output_matches_the_stock_renderer(self):
+        assert msgpack.unpackb(MessagePackRenderer().render(DATA)) == json.loads(JSONRenderer().render(DATA))
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+
+def get_claims(user):
+    # Read by core.authentication.ClaimsUser instead of the user row.
+    from store.customers import load_customer_id
+
+    return {'is_staff': user.is_staff, 'customer_id': load_customer_id(user)}
+
+
+class RefreshToken(BaseRefreshToken):
+    # The claims go on the access tokens only, read from the current row each
+    # time one is issued, so a change of is_staff applies from the next
+    # refresh.
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: self[api_settings.USER_ID_CLAIM]}).first()
+        if user is not None:
+            for claim, value in get_claims(user).items():
+                access[claim] = value
+        return access
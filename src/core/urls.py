@@ -1,7 +1,17 @@
 from django.views.generic import TemplateView
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import views
 
 # URLConf
 urlpatterns = [
-    path('', TemplateView.as_view(template_name='core/index.html'))
-]
\ No newline at end of file
+    path('', TemplateView.as_view(template_name='core/index.html')),
+    path('tags/<int:tag_pk>/products/', views.TagProductList.as_view(), name='tag-products'),
+]
+
+# djoser.urls with core's UserViewSet: the user endpoints, their format
+# suffixes and the API root at /auth/.
+router = DefaultRouter()
+router.register('users', views.UserViewSet)
+urlpatterns += [path('auth/', include(router.urls))]
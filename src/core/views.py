@@ -1,3 +1,30 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Exists, OuterRef
 from django.shortcuts import render
+from djoser.views import UserViewSet as BaseUserViewSet
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from store.models import Product
+from store.views import ProductList
+from tags.models import TaggedItem
 
 # Create your views here.
+
+class TagProductList(ProductList):
+    # /tags/<tag_pk>/products/ lists the products with that tag, with the
+    # same fields, filters and pagination as /store/products/.
+    http_method_names = ['get', 'head', 'options']
+
+    def narrow_queryset(self, queryset):
+        tagged = TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Product),
+            tag_id=self.kwargs['tag_pk'],
+            object_id=OuterRef('pk'),
+        )
+        return super().narrow_queryset(queryset).filter(Exists(tagged))
+
+
+class UserViewSet(BaseUserViewSet):
+    # /auth/users/me/ saves request.user, so it needs the current row rather
+    # than the token claims (see core.authentication).
+    authentication_classes = [JWTAuthentication]
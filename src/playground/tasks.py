@@ -1,10 +1,79 @@
-from time import sleep
+import uuid
+from itertools import islice
+
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+
+from store.models import Customer
+
+
+# Recipients per subtask, each subtask opening one SMTP connection.
+CHUNK_SIZE = 1000
+
+# Messages handed to the connection at a time.
+BATCH_SIZE = 100
+
+PROGRESS_KEY = 'notify_customers:{}'
+
+PROGRESS_TIMEOUT = 24 * 60 * 60
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def get_progress(run_id):
+    key = PROGRESS_KEY.format(run_id)
+    progress = cache.get_many([key, key + ':total'])
+    if key not in progress:
+        return None
+    return {'sent': progress[key], 'total': progress.get(key + ':total')}
+
+
+def add_progress(run_id, sent):
+    try:
+        cache.incr(PROGRESS_KEY.format(run_id), sent)
+    except ValueError:
+        # The counter expired, the run is no longer tracked.
+        pass
+
+
+@shared_task
+def notify_customers(message, subject='News from the store'):
+    # Streams the recipients and fans them out to send_notifications
+    # subtasks, which run in parallel and are rate limited through
+    # CELERY_TASK_ANNOTATIONS. Progress: get_progress(run_id).
+    run_id = uuid.uuid4().hex
+    customers = Customer.objects.exclude(user__email='')
+    total = customers.count()
+
+    key = PROGRESS_KEY.format(run_id)
+    cache.set_many({key: 0, key + ':total': total}, timeout=PROGRESS_TIMEOUT)
+
+    recipients = customers.order_by('id').values_list('user__email', flat=True).iterator(chunk_size=CHUNK_SIZE)
+    # Each chunk is queued as soon as it is read, so only one is held here
+    # at a time, and the workers send them in parallel.
+    for chunk in batched(recipients, CHUNK_SIZE):
+        send_notifications.delay(run_id, subject, message, chunk)
+    return {'run_id': run_id, 'total': total}
 
 
 @shared_task
-def notify_customers(message):
-    print('Sending 10K emails...')
-    print(message)
-    sleep(10)
-    print('Emails were successfully sent!')
\ No newline at end of file
+def send_notifications(run_id, subject, message, recipients):
+    # One message per recipient, so addresses are not disclosed to each
+    # other, over a single connection for the whole chunk.
+    sent = 0
+    with get_connection() as connection:
+        for batch in batched(recipients, BATCH_SIZE):
+            messages = [
+                EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [recipient], connection=connection)
+                for recipient in batch
+            ]
+            count = connection.send_messages(messages) or 0
+            add_progress(run_id, count)
+            sent += count
+    return sent
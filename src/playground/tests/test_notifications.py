@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+import pytest
+
+from playground import tasks
+
+
+@pytest.fixture
+def customers():
+    User = get_user_model()
+    # Creating a user creates its customer (see store.signals).
+    users = [User.objects.create(username=f'user-{index}', email=f'user-{index}@example.com') for index in range(7)]
+    User.objects.create(username='no-email', email='')
+    return users
+
+
+@pytest.mark.django_db
+class TestNotifyCustomers:
+    def test_sends_one_message_per_customer_in_chunks(self, customers, monkeypatch):
+        monkeypatch.setattr(tasks, 'CHUNK_SIZE', 3)
+        monkeypatch.setattr(tasks, 'BATCH_SIZE', 2)
+        connections = []
+        get_connection = tasks.get_connection
+        monkeypatch.setattr(tasks, 'get_connection', lambda: connections.append(1) or get_connection())
+
+        result = tasks.notify_customers.delay('Hello World!!').get()
+
+        assert sorted(message.to[0] for message in mail.outbox) == sorted(user.email for user in customers)
+        assert all(len(message.to) == 1 for message in mail.outbox)
+        assert len(connections) == 3
+        assert tasks.get_progress(result['run_id']) == {'sent': 7, 'total': 7}
@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache import cache
+from django.test import Client
+import pytest
+
+from core import fetch
+from core.fetch import ENTRY_KEY, LOCK_KEY, FetchTimeout, cached_fetch
+
+
+@pytest.fixture
+def upstream():
+    # A local stand-in for httpbin that counts its hits.
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            time.sleep(0.2)
+            body = json.dumps({'hits': len(hits)}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    cache.clear()
+    yield type('Upstream', (), {'url': f'http://127.0.0.1:{server.server_port}/json', 'hits': hits})
+    server.shutdown()
+    server.server_close()
+
+
+class TestCachedFetch:
+    def test_concurrent_misses_fetch_once(self, upstream):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: cached_fetch('key', upstream.url), range(8)))
+
+        assert len(upstream.hits) == 1
+        assert results == [{'hits': 1}] * 8
+
+    def test_one_waiter_takes_over_a_released_lock(self, upstream):
+        # A lock holder that fails releases the lock without an entry.
+        cache.add(LOCK_KEY.format('key'), 1)
+        threading.Timer(0.1, cache.delete, [LOCK_KEY.format('key')]).start()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: cached_fetch('key', upstream.url), range(4)))
+
+        assert len(upstream.hits) == 1
+        assert results == [{'hits': 1}] * 4
+
+    def test_waiters_do_not_fetch_without_the_lock(self, upstream, monkeypatch):
+        monkeypatch.setattr(fetch, 'WAIT_TIMEOUT', 0.1)
+        cache.add(LOCK_KEY.format('key'), 1)
+
+        with pytest.raises(FetchTimeout):
+            cached_fetch('key', upstream.url)
+        assert upstream.hits == []
+
+    def test_serves_stale_data_and_refreshes_it(self, upstream, monkeypatch):
+        cached_fetch('key', upstream.url, ttl=60)
+        entry = cache.get(ENTRY_KEY.format('key'))
+        cache.set(ENTRY_KEY.format('key'), {**entry, 'fresh_until': time.time() - 1})
+
+        # Tasks run eagerly in the tests, so the refresh is done when the
+        # stale value is returned.
+        assert cached_fetch('key', upstream.url, ttl=60) == {'hits': 1}
+        assert cached_fetch('key', upstream.url, ttl=60) == {'hits': 2}
+        assert len(upstream.hits) == 2
+
+    def test_ignores_values_cached_in_the_old_format(self, upstream):
+        cache.set('key', {'origin': '127.0.0.1'})
+
+        assert cached_fetch('key', upstream.url) == {'hits': 1}
+
+
+def test_say_hello_renders_the_cached_upstream_response(upstream, settings):
+    settings.PLAYGROUND_HELLO_URL = upstream.url
+    client = Client()
+
+    client.get('/playground/hello/')
+    response = client.get('/playground/hello/')
+
+    assert response.status_code == 200
+    assert b'hits' in response.content
+    assert len(upstream.hits) == 1
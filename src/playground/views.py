@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.shortcuts import render
-import requests
-from django.core.cache import cache
+
+from core.fetch import cached_fetch
 # from .tasks import notify_customers
 
 
@@ -9,9 +10,5 @@ from django.core.cache import cache
 #     return render(request, 'hello.html', {'name': 'Yann'})
 
 def say_hello(request):
-    key = 'httpbin_result'
-    if cache.get(key) is None:
-        response = requests.get("https://httpbin.org/delay/2")
-        data = response.json()
-        cache.set(key, data)
-    return render(request, 'hello.html', {'name': cache.get(key)})
+    data = cached_fetch('httpbin_result', settings.PLAYGROUND_HELLO_URL, ttl=5 * 60, stale_ttl=60 * 60)
+    return render(request, 'hello.html', {'name': data})
@@ -1,11 +1,11 @@
 from django.contrib import admin, messages
 from django.db.models.query import QuerySet
-from django.http import HttpRequest
 from django.db.models.aggregates import Count
 from django.urls import reverse
 from django.utils.html import format_html
 from urllib.parse import urlencode
 
+from .cache import invalidate
 from .models import Product, Collection, Customer, Order, OrderItem, Cart, CartItem, Promotion,Address
 
 
@@ -34,9 +34,6 @@ class CollectionAdmin(admin.ModelAdmin):
     def products_count(self, collection):
         url = reverse('admin:store_product_changelist') + '?' + urlencode({'collection__id': str(collection.id)})
         return format_html('<a href="{}">{}</a>', url, collection.products_count)
-    
-    def get_queryset(self, request: HttpRequest) -> QuerySet:
-        return super().get_queryset(request).annotate(products_count=Count('products'))    
 
 
 @admin.register(Product)
@@ -61,6 +58,7 @@ class ProductAdmin(admin.ModelAdmin):
     @admin.action(description='Clean Inventory')
     def clean_inventory(self, request, queryset: QuerySet):
         update_count = queryset.update(inventory=0)
+        invalidate('product')
         self.message_user(request, f'{update_count} products were successfully update', messages.ERROR)
 
 
@@ -0,0 +1,135 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+
+from rest_framework.response import Response
+
+from . import views
+from .cache import CachedResponseMixin, ConditionalResponseMixin, aget_response_key, get_cache_entry, is_cacheable, is_shareable, set_validators
+
+
+# Async GET endpoints for the catalog, mounted under /store/async/. Each one
+# wraps the DRF view serving the same resource and reuses its queryset,
+# filters, pagination, permissions and serializer. Rows are fetched with the
+# async ORM and cached responses with the async cache API. Under ASGI, a
+# request waiting on the database or a slow client holds no worker thread.
+#
+# Authentication and permissions, and serialization, which may touch the
+# database lazily, still run through sync_to_async.
+class AsyncReadView(View):
+    http_method_names = ['get', 'head', 'options']
+    view_class = None
+    # Detail views look up one object by the view's lookup kwarg, like the
+    # detail flag of DRF's router actions.
+    detail = False
+
+    # Rows fetched per query by aiterator(), which also runs the prefetches
+    # per chunk.
+    chunk_size = 2000
+
+    async def get(self, request, *args, **kwargs):
+        view = self.view_class()
+        view.setup(request, *args, **kwargs)
+        view.format_kwarg = None
+        view.headers = {}
+        request = view.request = view.initialize_request(request, *args, **kwargs)
+
+        cache_key = validators = None
+        try:
+            await sync_to_async(view.initial)(request, *args, **kwargs)
+
+            if isinstance(view, ConditionalResponseMixin):
+                validators = await sync_to_async(view.get_validators)(request)
+                if validators is not None:
+                    not_modified = get_conditional_response(
+                        request, etag=validators[0], last_modified=validators[1])
+                    if not_modified is not None:
+                        return set_validators(not_modified, validators)
+
+            if isinstance(view, CachedResponseMixin) and is_shareable(request):
+                cache_key = await aget_response_key(request, view.cache_dependencies)
+                cached = await cache.aget(cache_key)
+                if cached is not None:
+                    content, content_type = cached
+                    return set_validators(HttpResponse(content, content_type=content_type), validators)
+
+            response = await (self.retrieve(view, request) if self.detail else self.list(view, request))
+        except Exception as exc:
+            response = view.handle_exception(exc)
+
+        # The browsable API renders forms and the user from the database.
+        response = await sync_to_async(self.finalize_response)(view, request, response, *args, **kwargs)
+        if cache_key is not None and is_cacheable(response):
+            await cache.aset(cache_key, get_cache_entry(response), timeout=settings.STORE_RESPONSE_CACHE_TIMEOUT)
+        return set_validators(response, validators)
+
+    def finalize_response(self, view, request, response, *args, **kwargs):
+        return view.finalize_response(request, response, *args, **kwargs).render()
+
+    async def list(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+
+        if paginator is None:
+            data = await self.serialize(view.get_serializer(await self.fetch(queryset), many=True))
+            response = Response(data)
+        else:
+            # The keyset paginator builds the page query without running it.
+            page_queryset = paginator.get_page_queryset(queryset, request, view)
+            page = paginator.set_page(await self.fetch(page_queryset, chunk_size=paginator.page_size + 1))
+            data = await self.serialize(view.get_serializer(page, many=True))
+            response = paginator.get_paginated_response(data)
+
+        if hasattr(view, 'get_facets'):
+            facets = await sync_to_async(view.get_facets)(request)
+            if facets is not None:
+                response.data['facets'] = facets
+        return response
+
+    async def retrieve(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+        view.check_object_permissions(request, instance)
+        return Response(await self.serialize(view.get_serializer(instance)))
+
+    async def fetch(self, queryset, chunk_size=None):
+        return [item async for item in queryset.aiterator(chunk_size=chunk_size or self.chunk_size)]
+
+    async def serialize(self, serializer):
+        return await sync_to_async(lambda: serializer.data)()
+
+
+class ProductList(AsyncReadView):
+    view_class = views.ProductList
+
+class ProductDetails(AsyncReadView):
+    view_class = views.ProductDetails
+    detail = True
+
+class CollectionList(AsyncReadView):
+    view_class = views.CollectionList
+
+class CollectionDetails(AsyncReadView):
+    view_class = views.CollectionDetails
+    detail = True
+
+class ReviewList(AsyncReadView):
+    view_class = views.ReviewList
+
+class ReviewDetails(AsyncReadView):
+    view_class = views.ReviewDetails
+    detail = True
+
+class ProductImageList(AsyncReadView):
+    view_class = views.ProductImageList
+
+class ProductImageDetails(AsyncReadView):
+    view_class = views.ProductImageDetails
+    detail = True
@@ -0,0 +1,191 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from rest_framework.response import Response
+
+
+# Cached responses are keyed on generation counters rather than deleted on
+# write: saving a product bumps the "product" generation, and every response
+# that depends on it is looked up under a new key from then on. Old entries
+# are never served again and simply expire.
+GENERATION_KEY = 'store:generation:{}'
+RESPONSE_KEY = 'store:response:{}'
+VALIDATORS_KEY = '{}:validators'
+# When each generation was last bumped, for Last-Modified.
+MODIFIED_KEY = 'store:modified:{}'
+
+
+def get_generations(names):
+    keys = [GENERATION_KEY.format(name) for name in names]
+    generations = cache.get_many(keys)
+
+    for key in keys:
+        if key not in generations:
+            # A missing counter may have been evicted, so it must not restart
+            # from a value that older entries were stored under.
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+async def aget_generations(names):
+    keys = [GENERATION_KEY.format(name) for name in names]
+    generations = await cache.aget_many(keys)
+
+    for key in keys:
+        if key not in generations:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            generations[key] = await cache.aget(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(name):
+    key = GENERATION_KEY.format(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+    cache.set(MODIFIED_KEY.format(name), time.time(), timeout=None)
+
+
+def get_modified(names):
+    # Latest bump of the named generations, as a timestamp. An unknown one
+    # counts as modified now, which can only cause a spurious 200.
+    keys = [MODIFIED_KEY.format(name) for name in names]
+    modified = cache.get_many(keys)
+
+    for key in keys:
+        if key not in modified:
+            cache.add(key, time.time(), timeout=None)
+            modified[key] = cache.get(key)
+    return max(modified.values(), default=0)
+
+
+def invalidate(name):
+    # Bump now for readers inside this transaction and again on commit, so a
+    # response computed from the old rows in between is not kept.
+    bump_generation(name)
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+def get_response_key(request, dependencies):
+    return make_response_key(request, dependencies, get_generations(dependencies))
+
+
+async def aget_response_key(request, dependencies):
+    return make_response_key(request, dependencies, await aget_generations(dependencies))
+
+
+def is_shareable(request):
+    # The browsable API's HTML shows the user, their forms and a logout link,
+    # so only the data formats are cached and shared between users.
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.media_type != 'text/html'
+
+
+def make_response_key(request, dependencies, generations):
+    parts = [
+        request.build_absolute_uri(),
+        request.META.get('HTTP_ACCEPT', ''),
+        *(f'{name}={generation}' for name, generation in zip(dependencies, generations)),
+    ]
+    digest = hashlib.md5('\n'.join(parts).encode('utf-8')).hexdigest()
+    return RESPONSE_KEY.format(digest)
+
+
+class CachedResponseMixin:
+    # Names of the generations the response depends on (see store.signals).
+    cache_dependencies = ()
+
+    def get(self, request, *args, **kwargs):
+        if not is_shareable(request):
+            return super().get(request, *args, **kwargs)
+
+        key = get_response_key(request, self.cache_dependencies)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        self.response_cache_key = key
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        key = getattr(self, 'response_cache_key', None)
+        if key is not None and is_cacheable(response):
+            cache.set(key, get_cache_entry(response), timeout=settings.STORE_RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalResponseMixin:
+    # Answers If-None-Match and If-Modified-Since with 304 Not Modified
+    # before anything is loaded or serialized. The validators come from
+    # get_freshness(), a cheap probe of the rows, and the cache_dependencies
+    # generations, which also cover writes that leave last_update alone
+    # (reviews, images, promotions, update()). The probe runs once per
+    # generation: its result is cached under the response key.
+    cache_dependencies = ()
+
+    def get_freshness(self, request):
+        # (latest update of the rows or None, other values for the ETag), or
+        # None to answer without validators, e.g. when the object is missing.
+        return None, []
+
+    def get_validators(self, request):
+        if not is_shareable(request):
+            return None
+        key = get_response_key(request, self.cache_dependencies)
+        validators = cache.get(VALIDATORS_KEY.format(key))
+        if validators is not None:
+            return validators
+
+        freshness = self.get_freshness(request)
+        if freshness is None:
+            return None
+        last_update, parts = freshness
+        last_modified = get_modified(self.cache_dependencies)
+        if last_update is not None:
+            last_modified = max(last_modified, last_update.timestamp())
+
+        digest = hashlib.md5('\n'.join([key, *map(str, parts)]).encode('utf-8')).hexdigest()
+        validators = (f'W/"{digest}"', int(last_modified))
+        cache.set(VALIDATORS_KEY.format(key), validators, timeout=settings.STORE_RESPONSE_CACHE_TIMEOUT)
+        return validators
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators(request)
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=validators[0], last_modified=validators[1])
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return set_validators(response, validators)
+
+
+def set_validators(response, validators):
+    if validators is not None and response.status_code in (200, 304):
+        etag, last_modified = validators
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def is_cacheable(response):
+    if not isinstance(response, Response) or response.status_code != 200:
+        return False
+    response.render()
+    return len(response.content) <= settings.STORE_RESPONSE_CACHE_MAX_SIZE
+
+
+def get_cache_entry(response):
+    return (response.content, response['Content-Type'])
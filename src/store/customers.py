@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Customer
+
+
+CUSTOMER_ID_KEY = 'store:customer_id:{}'
+
+
+def get_customer_id(request):
+    # The id of the customer of request.user, or None. A user keeps the same
+    # customer, so the id is cached for STORE_CUSTOMER_CACHE_TIMEOUT.
+    request = getattr(request, '_request', request)
+    if hasattr(request, '_cached_customer'):
+        return request._cached_customer and request._cached_customer.id
+    if not hasattr(request, '_cached_customer_id'):
+        request._cached_customer_id = load_customer_id(request.user)
+    return request._cached_customer_id
+
+
+def load_customer_id(user):
+    if not user.is_authenticated:
+        return None
+    # Access tokens carry it, see core.tokens.
+    if getattr(user, 'customer_id', None) is not None:
+        return user.customer_id
+    timeout = settings.STORE_CUSTOMER_CACHE_TIMEOUT
+    key = CUSTOMER_ID_KEY.format(user.pk)
+
+    customer_id = cache.get(key) if timeout else None
+    if customer_id is None:
+        customer_id = Customer.objects.filter(user_id=user.pk).values_list('id', flat=True).order_by().first()
+        if customer_id is not None and timeout:
+            cache.set(key, customer_id, timeout=timeout)
+    return customer_id
+
+
+def get_customer(request):
+    # The customer of request.user, or None, loaded once per request.
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_cached_customer'):
+        customer = None
+        if request.user.is_authenticated:
+            customer = Customer.objects.filter(user_id=request.user.pk).order_by().first()
+        request._cached_customer = customer
+    return request._cached_customer
+
+
+def forget_customer_id(user_id):
+    cache.delete(CUSTOMER_ID_KEY.format(user_id))
+
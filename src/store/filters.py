@@ -0,0 +1,102 @@
+from django.db.models import Count, Exists, OuterRef, Q
+
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Product
+
+
+# Upper bounds of the price facet buckets, the last one is open-ended.
+# Prices are filtered and bucketed on effective_price, what customers pay.
+PRICE_BUCKETS = [25, 50, 100]
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    collection = serializers.ListField(child=serializers.IntegerField(), required=False)
+    min_price = serializers.DecimalField(max_digits=8, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=8, decimal_places=2, required=False)
+    in_stock = serializers.BooleanField(required=False, allow_null=True)
+    on_promotion = serializers.BooleanField(required=False, allow_null=True)
+    facets = serializers.BooleanField(required=False)
+
+
+def on_promotion():
+    return Exists(Product.promotions.through.objects.filter(product_id=OuterRef('pk')))
+
+
+def get_price_buckets():
+    bounds = [None, *PRICE_BUCKETS, None]
+    return [
+        (f'price_{index}', low, high, Q(**{
+            key: value for key, value in [('effective_price__gte', low), ('effective_price__lt', high)] if value is not None
+        }))
+        for index, (low, high) in enumerate(zip(bounds, bounds[1:]))
+    ]
+
+
+class ProductFilter(BaseFilterBackend):
+    # ?collection=1&collection=2&min_price=10&max_price=50&in_stock=true
+    # &on_promotion=true filters the list. With ?facets=true the view adds
+    # the counts of each option, see get_facets().
+
+    def get_params(self, request):
+        serializer = ProductFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def filter_queryset(self, request, queryset, view):
+        params = self.get_params(request)
+        queryset = self.filter_attributes(queryset, params)
+        if params.get('collection'):
+            queryset = queryset.filter(collection_id__in=params['collection'])
+        return queryset
+
+    def filter_attributes(self, queryset, params):
+        if params.get('min_price') is not None:
+            queryset = queryset.filter(effective_price__gte=params['min_price'])
+        if params.get('max_price') is not None:
+            queryset = queryset.filter(effective_price__lte=params['max_price'])
+        if params.get('in_stock') is not None:
+            in_stock = Q(inventory__gt=0)
+            queryset = queryset.filter(in_stock if params['in_stock'] else ~in_stock)
+        if params.get('on_promotion') is not None:
+            promoted = Q(on_promotion())
+            queryset = queryset.filter(promoted if params['on_promotion'] else ~promoted)
+        return queryset
+
+    def get_facets(self, request, queryset):
+        # All the counts come from one GROUP BY collection query. It ignores
+        # the collection filter, so every collection keeps its count, and
+        # the other facets add up the rows of the selected collections.
+        params = self.get_params(request)
+        buckets = get_price_buckets()
+
+        rows = self.filter_attributes(queryset, params) \
+            .order_by() \
+            .values('collection_id', 'collection__title') \
+            .annotate(
+                count=Count('id'),
+                in_stock=Count('id', filter=Q(inventory__gt=0)),
+                on_promotion=Count('id', filter=Q(on_promotion())),
+                **{name: Count('id', filter=condition) for name, _, _, condition in buckets},
+            ) \
+            .order_by('collection__title', 'collection_id')
+
+        selected = set(params.get('collection') or [])
+        totals = {name: 0 for name in ['in_stock', 'on_promotion', *(bucket[0] for bucket in buckets)]}
+        collections = []
+        for row in rows:
+            collections.append({'id': row['collection_id'], 'title': row['collection__title'], 'count': row['count']})
+            if not selected or row['collection_id'] in selected:
+                for name in totals:
+                    totals[name] += row[name]
+
+        return {
+            'collection': collections,
+            'price': [
+                {'min': low, 'max': high, 'count': totals[name]}
+                for name, low, high, _ in buckets
+            ],
+            'in_stock': totals['in_stock'],
+            'on_promotion': totals['on_promotion'],
+        }
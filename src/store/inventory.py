@@ -0,0 +1,53 @@
+from django.db.models import Case, F, IntegerField, When
+
+from rest_framework.exceptions import ValidationError
+
+from .cache import invalidate
+from .models import Cart, Product
+
+
+class InsufficientInventory(ValidationError):
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__({
+            'inventory': [f'Not enough inventory for product {product_id}.' for product_id in product_ids]
+        })
+
+
+def lock_carts(cart_ids):
+    # Carts are locked before their products, in id order, so that a cart
+    # submitted twice is ordered once: the second submit waits here, then
+    # finds it gone. Returns the ids of the carts that still exist.
+    return set(Cart.objects.select_for_update().filter(id__in=cart_ids).order_by('id').values_list('id', flat=True))
+
+
+def get_locked_inventory(product_ids):
+    # Locking in id order means two orders sharing products always queue in
+    # the same sequence and cannot deadlock each other.
+    return dict(
+        Product.objects.select_for_update()
+        .filter(id__in=product_ids)
+        .order_by('id')
+        .values_list('id', 'inventory')
+    )
+
+
+def decrement_inventory(quantities):
+    # One UPDATE ... SET inventory = CASE id WHEN ... END for every product.
+    Product.objects.filter(id__in=quantities).update(inventory=Case(
+        *[When(id=product_id, then=F('inventory') - quantity) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    ))
+    invalidate('product')
+
+
+def reserve_inventory(quantities):
+    # quantities maps product ids to the number of units to take. Must run
+    # inside transaction.atomic() so that the locks last until commit.
+    inventory = get_locked_inventory(sorted(quantities))
+
+    short = [product_id for product_id in sorted(quantities) if inventory.get(product_id, 0) < quantities[product_id]]
+    if short:
+        raise InsufficientInventory(short)
+
+    decrement_inventory(quantities)
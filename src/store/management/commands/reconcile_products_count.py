@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Collection
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Collection.products_count for every collection that drifted.'
+
+    def handle(self, *args, **options):
+        fixed = Collection.objects.reconcile_products_count()
+        self.stdout.write(self.style.SUCCESS(f'{fixed} collection(s) reconciled.'))
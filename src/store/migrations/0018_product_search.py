@@ -0,0 +1,78 @@
+from django.db import migrations
+
+
+# The search index lives outside the Product model (see store.search), and
+# other databases fall back to icontains lookups.
+
+POSTGRESQL_FORWARDS = [
+    """
+    ALTER TABLE store_product ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX store_product_search_idx ON store_product USING GIN (search_vector)',
+]
+
+POSTGRESQL_BACKWARDS = [
+    'DROP INDEX IF EXISTS store_product_search_idx',
+    'ALTER TABLE store_product DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE store_product_fts USING fts5(
+        title, description, content='store_product', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER store_product_fts_insert AFTER INSERT ON store_product BEGIN
+        INSERT INTO store_product_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER store_product_fts_delete AFTER DELETE ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER store_product_fts_update AFTER UPDATE OF title, description ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO store_product_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO store_product_fts(store_product_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER IF EXISTS store_product_fts_insert',
+    'DROP TRIGGER IF EXISTS store_product_fts_delete',
+    'DROP TRIGGER IF EXISTS store_product_fts_update',
+    'DROP TABLE IF EXISTS store_product_fts',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_productimage_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRESQL_FORWARDS, 'sqlite': SQLITE_FORWARDS}),
+            run({'postgresql': POSTGRESQL_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}),
+        ),
+    ]
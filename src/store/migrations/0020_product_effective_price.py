@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:29
+
+from django.db import migrations, models
+from django.db.models import Max
+
+from store.pricing import get_effective_price
+
+
+def compute_effective_prices(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+
+    products = Product.objects.annotate(best_discount=Max('promotions__discount')).only('id', 'unit_price')
+    changed = []
+    for product in products.iterator(chunk_size=2000):
+        product.effective_price = get_effective_price(product.unit_price, product.best_discount)
+        changed.append(product)
+    Product.objects.bulk_update(changed, ['effective_price'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_product_collection_price_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='store_produ_collect_5f8db0_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8),
+        ),
+        migrations.RunPython(compute_effective_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price', 'id'], name='store_produ_effecti_707a96_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['collection', 'effective_price'], name='store_produ_collect_89646d_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_customers(apps, schema_editor):
+    # Keeps the oldest customer of each user and moves the orders and
+    # addresses of the others to it.
+    Customer = apps.get_model('store', 'Customer')
+    Order = apps.get_model('store', 'Order')
+    Address = apps.get_model('store', 'Address')
+
+    duplicates = Customer.objects.order_by().values('user_id') \
+        .annotate(count=Count('id'), kept_id=Min('id')) \
+        .filter(count__gt=1)
+    for row in duplicates:
+        others = Customer.objects.filter(user_id=row['user_id']).exclude(pk=row['kept_id'])
+        Order.objects.filter(customer__in=others).update(customer_id=row['kept_id'])
+        Address.objects.filter(customer__in=others).update(customer_id=row['kept_id'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0021_product_last_update_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_customers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customer',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
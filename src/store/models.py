@@ -1,18 +1,37 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import connection, IntegrityError, models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.conf import settings
 from django.contrib import admin
 
+from .cache import invalidate
+from .pricing import get_effective_price
 from .validators import validate_file_size
 
 class Promotion(models.Model):
     description = models.CharField(max_length=255)
     discount = models.FloatField()
 
+class CollectionManager(models.Manager):
+    def reconcile_products_count(self):
+        # Fixes every drifted counter with a single UPDATE and returns how
+        # many collections were wrong.
+        actual = Coalesce(Subquery(
+            Product.objects.filter(collection=OuterRef('pk')).order_by()
+            .values('collection').annotate(count=Count('id')).values('count')
+        ), 0)
+        return self.exclude(products_count=actual).update(products_count=actual)
+
 class Collection(models.Model):
+    objects = CollectionManager()
     title = models.CharField(max_length=255)
     featured_product = models.ForeignKey(
         'Product', on_delete=models.SET_NULL, null=True, related_name='+', blank=True)
+    # Maintained by the Product signals in store.signals
+    products_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return self.title   
@@ -20,7 +39,30 @@ class Collection(models.Model):
         ordering = ['title']
 
  
+class ProductManager(models.Manager):
+    def refresh_effective_prices(self, product_ids=None):
+        # Recomputes effective_price for the given products, or all of them,
+        # and returns how many changed. Used where the save() hook in
+        # store.signals does not run: promotion changes and bulk writes.
+        products = self.all() if product_ids is None else self.filter(pk__in=product_ids)
+        products = products.order_by() \
+            .annotate(best_discount=Max('promotions__discount')) \
+            .only('id', 'unit_price', 'effective_price')
+
+        changed = []
+        for product in products.iterator(chunk_size=2000):
+            price = get_effective_price(product.unit_price, product.best_discount)
+            if price != product.effective_price:
+                product.effective_price = price
+                changed.append(product)
+
+        self.bulk_update(changed, ['effective_price'], batch_size=1000)
+        if changed:
+            invalidate('product')
+        return len(changed)
+
 class Product(models.Model):
+    objects = ProductManager()
     title = models.CharField(max_length=255)
     slug = models.SlugField(null=True, blank=True)
     description = models.TextField()
@@ -29,17 +71,31 @@ class Product(models.Model):
     last_update = models.DateTimeField(auto_now=True)
     collection = models.ForeignKey(Collection, on_delete=models.PROTECT, related_name='products')
     promotions = models.ManyToManyField(Promotion, blank=True)
+    # unit_price with the best promotion and tax applied, see store.pricing.
+    # Kept current by store.signals.
+    effective_price = models.DecimalField(max_digits=8, decimal_places=2, default=0, editable=False)
 
     def __str__(self) -> str:
         return self.title   
     
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['title', 'id']),
+            models.Index(fields=['effective_price', 'id']),
+            # Collection filter with a price range, and the facet counts.
+            models.Index(fields=['collection', 'effective_price']),
+            # Max('last_update') of the conditional GET probe.
+            models.Index(fields=['last_update']),
+        ]
 
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='store/images', validators=[validate_file_size])
+    # Resized copies written by store.tasks.generate_renditions:
+    # [{'path': ..., 'format': 'webp', 'width': 320, 'height': 240}, ...]
+    renditions = models.JSONField(default=list, blank=True, editable=False)
 
 class Customer(models.Model):
     MEMBERSHIP_BRONZE = 'B'
@@ -57,7 +113,7 @@ class Customer(models.Model):
     phone = models.CharField(max_length=255)
     birth_date = models.DateField(null=True)
     membership = models.CharField(max_length=1, choices=MEMBERSHIP_CHOICES, default=MEMBERSHIP_BRONZE)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
     class Meta:
         ordering = ['user__first_name', 'user__last_name']
@@ -89,16 +145,76 @@ class Order(models.Model):
     payment_status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDING)
     customer = models.ForeignKey(Customer, on_delete=models.PROTECT, related_name='orders')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['placed_at', 'id']),
+        ]
+
 class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='orderitems')
     order = models.ForeignKey(Order, on_delete=models.PROTECT, related_name='items')
     quantity = models.PositiveSmallIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
 
+class CartManager(models.Manager):
+    def with_totals(self):
+        return self.annotate(
+            items_count=Count('items'),
+            total_price=Coalesce(Sum(F('items__quantity') * F('items__product__unit_price')), Value(Decimal(0))),
+        )
+
 class Cart(models.Model):
+    objects = CartManager()
     created_at = models.DateTimeField(auto_now_add=True)
 
+class CartItemManager(models.Manager):
+    def with_total_price(self):
+        return self.select_related('product').annotate(total_price=F('quantity') * F('product__unit_price'))
+
+    def add_quantity(self, cart_id, product_id, quantity):
+        # Inserts the line or increments it in one statement, so concurrent
+        # adds to the same cart cannot lose updates. Returns None when the
+        # product does not exist.
+        features = connection.features
+        if features.supports_update_conflicts_with_target and features.can_return_columns_from_insert:
+            return self._upsert(cart_id, product_id, quantity)
+        return self._update_or_create(cart_id, product_id, quantity)
+
+    def _upsert(self, cart_id, product_id, quantity):
+        cart_item_table = connection.ops.quote_name(self.model._meta.db_table)
+        product_table = connection.ops.quote_name(Product._meta.db_table)
+        sql = f'''
+            INSERT INTO {cart_item_table} (cart_id, product_id, quantity)
+            SELECT %s, id, %s FROM {product_table} WHERE id = %s
+            ON CONFLICT (cart_id, product_id)
+            DO UPDATE SET quantity = {cart_item_table}.quantity + EXCLUDED.quantity
+            RETURNING id, quantity
+        '''
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [cart_id, quantity, product_id])
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        return self.model(id=row[0], cart_id=cart_id, product_id=product_id, quantity=row[1])
+
+    def _update_or_create(self, cart_id, product_id, quantity):
+        with transaction.atomic():
+            if not Product.objects.filter(pk=product_id).exists():
+                return None
+
+            items = self.filter(cart_id=cart_id, product_id=product_id)
+            if not items.update(quantity=F('quantity') + quantity):
+                try:
+                    with transaction.atomic():
+                        return self.create(cart_id=cart_id, product_id=product_id, quantity=quantity)
+                except IntegrityError:
+                    # Another request inserted the line first.
+                    items.update(quantity=F('quantity') + quantity)
+            return items.get()
+
 class CartItem(models.Model):
+    objects = CartItemManager()
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     quantity = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
@@ -0,0 +1,14 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+
+TAX_RATE = Decimal('1.19')
+
+CENTS = Decimal('0.01')
+
+
+def get_effective_price(unit_price, discount=None):
+    # The price customers pay: the best promotion applied, tax included,
+    # rounded to cents. Promotion.discount is a fraction, e.g. 0.2 for 20%.
+    discount = Decimal(str(min(max(discount or 0, 0), 1)))
+    unit_price = Decimal(str(unit_price))
+    return (unit_price * (1 - discount) * TAX_RATE).quantize(CENTS, rounding=ROUND_HALF_UP)
@@ -0,0 +1,105 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# The index itself is created by migration 0018_product_search:
+# - PostgreSQL: a stored, generated tsvector column with a GIN index.
+# - SQLite: an FTS5 external-content table kept in sync by triggers.
+# Titles weigh more than descriptions in the rank on both.
+POSTGRESQL_QUERY = "websearch_to_tsquery('english', %s)"
+
+SQLITE_WEIGHTS = (10.0, 1.0)
+
+
+# SQLite rebuilds a table on most ALTERs, which drops its triggers, so these
+# are recreated after every migrate (see store.signals).
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS store_product_fts_insert AFTER INSERT ON store_product BEGIN
+        INSERT INTO store_product_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_product_fts_delete AFTER DELETE ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_product_fts_update AFTER UPDATE OF title, description ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO store_product_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+
+def restore_sqlite_triggers(connection):
+    if connection.vendor != 'sqlite' or 'store_product_fts' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+        # Rows written while the triggers were missing are not indexed.
+        cursor.execute("INSERT INTO store_product_fts(store_product_fts) VALUES ('rebuild')")
+
+
+def get_search_terms(query):
+    return re.findall(r'\w+', query)
+
+
+def no_matches(queryset):
+    # Annotated like the matches, so that ordering on rank still works.
+    return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_products(queryset, query):
+    # Filters the products matching `query` and annotates them with a
+    # `rank`, higher being more relevant.
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(queryset, query)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(queryset, query)
+
+    terms = get_search_terms(query)
+    if not terms:
+        return no_matches(queryset)
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def _search_postgresql(queryset, query):
+    # ts_rank_cd() returns a real, cast so that cursor positions compare exactly.
+    return queryset.filter(
+        RawSQL(f'store_product.search_vector @@ {POSTGRESQL_QUERY}', [query], output_field=BooleanField())
+    ).annotate(
+        rank=RawSQL(f'ts_rank_cd(store_product.search_vector, {POSTGRESQL_QUERY})::float8', [query],
+                    output_field=FloatField())
+    )
+
+
+def _search_sqlite(queryset, query):
+    # Each term is quoted so user input cannot use the FTS5 query syntax.
+    terms = get_search_terms(query)
+    if not terms:
+        return no_matches(queryset)
+    match = ' '.join(f'"{term}"' for term in terms)
+
+    weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+    return queryset.filter(
+        id__in=RawSQL('SELECT rowid FROM store_product_fts WHERE store_product_fts MATCH %s', [match])
+    ).annotate(
+        # bm25() is lower for better matches.
+        rank=RawSQL(
+            f'SELECT -bm25(store_product_fts, {weights}) FROM store_product_fts '
+            'WHERE store_product_fts MATCH %s AND rowid = store_product.id',
+            [match], output_field=FloatField())
+    )
@@ -1,13 +1,85 @@
 from decimal import Decimal
 
-from django.db import transaction
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
 
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.reverse import reverse
 
+from .inventory import decrement_inventory, get_locked_inventory, lock_carts, reserve_inventory
+from .tasks import RENDITION_MIME_TYPES
+from .validators import validate_file_size
 from .models import Product, Collection, Review, Cart, Order, CartItem, OrderItem, Customer, ProductImage
 
 
-class CollectionSerializer(serializers.ModelSerializer):
+def get_query_list(request, name):
+    if request is None:
+        return []
+    return [value for value in request.query_params.get(name, '').split(',') if value]
+
+def is_summary(request):
+    return request is not None and request.query_params.get('summary', '').lower() in ('1', 'true', 'yes')
+
+
+class DynamicFieldsMixin:
+    # ?fields=id,title limits a read to the listed top-level fields, and
+    # ?expand=reviews adds fields from Meta.expandable_fields, which are left
+    # out by default. Views use get_selected_fields() and get_only_fields()
+    # to shape their queryset the same way.
+
+    @classmethod
+    def get_selected_fields(cls, request):
+        expand = get_query_list(request, 'expand')
+        expandable = getattr(cls.Meta, 'expandable_fields', [])
+        selected = [name for name in cls.Meta.fields if name not in expandable or name in expand]
+
+        requested = get_query_list(request, 'fields')
+        if requested and request.method in SAFE_METHODS:
+            selected = [name for name in selected if name in requested]
+        return selected
+
+    @classmethod
+    def get_only_fields(cls, request):
+        # Model columns needed to render the selected fields, for only().
+        field_columns = getattr(cls.Meta, 'field_columns', {})
+        model_fields = {field.name for field in cls.Meta.model._meta.concrete_fields}
+        columns = {'id'}
+        for name in cls.get_selected_fields(request):
+            if name in field_columns:
+                columns.update(field_columns[name])
+            elif name in model_fields:
+                columns.add(name)
+        return columns
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_top_level():
+            return fields
+        selected = set(self.get_selected_fields(self.context.get('request')))
+        return {name: field for name, field in fields.items() if name in selected}
+
+    def is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+class CachedHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
+    # A product list points at a handful of collections, so each URL is
+    # reversed once per response instead of once per row.
+    def get_url(self, obj, view_name, request, format):
+        urls = self.__dict__.setdefault('_urls', {})
+        key = (obj.pk, format)
+        if key not in urls:
+            urls[key] = super().get_url(obj, view_name, request, format)
+        return urls[key]
+
+
+class CollectionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Collection
         fields = ['id', 'title', 'featured_product', 'products_count']
@@ -15,7 +87,7 @@ class CollectionSerializer(serializers.ModelSerializer):
     products_count = serializers.IntegerField(read_only=True)
         
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Review    
         fields = ["id", "name", "description", "date", "product"]
@@ -25,23 +97,64 @@ class ReviewSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         product_id = self.context['product_id']
         return Review.objects.create(product_id=product_id, **validated_data)
+
+class SimpleReviewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Review
+        fields = ["id", "name", "description", "date"]
     
-class ProductImageSerializer(serializers.ModelSerializer):
+class SniffedImageField(serializers.ImageField):
+    # Files from store.uploadhandlers.ImageUploadHandler were sniffed and had
+    # their header parsed while streaming, so Pillow is not run again.
+    def to_internal_value(self, data):
+        if getattr(data, 'image', None) is None:
+            return super().to_internal_value(data)
+        return serializers.FileField.to_internal_value(self, data)
+
+
+class ProductImageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    image = SniffedImageField(validators=[validate_file_size])
+
     def create(self, validated_data):
         product_id = self.context["product_id"]
         return ProductImage.objects.create(product_id=product_id, **validated_data)
     class Meta:
         model = ProductImage
-        fields = ["id", "image"]
+        fields = ["id", "image", "srcset"]
+
+    srcset = serializers.SerializerMethodField()
+
+    def get_srcset(self, product_image: ProductImage):
+        # One srcset per format, for the <source type=...> of a <picture>.
+        # Empty until store.tasks.generate_renditions has run.
+        request = self.context.get('request')
+        srcset = {}
+        for rendition in product_image.renditions:
+            url = default_storage.url(rendition['path'])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            mime_type = RENDITION_MIME_TYPES[rendition['format']]
+            srcset.setdefault(mime_type, []).append(f"{url} {rendition['width']}w")
+        return {mime_type: ', '.join(candidates) for mime_type, candidates in srcset.items()}
     
-class ProductSerializer(serializers.ModelSerializer):
-    reviews = ReviewSerializer(many=True, read_only=True)
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Only the latest reviews are embedded, and only with ?expand=reviews.
+    # The view prefetches them into `latest_reviews`.
+    reviews = SimpleReviewSerializer(source='latest_reviews', many=True, read_only=True)
+    reviews_count = serializers.IntegerField(read_only=True)
+    reviews_url = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
+
+    # Generations of the cached responses rendered with this serializer.
+    cache_dependencies = ['product', 'review', 'productimage', 'promotion']
+
     class Meta:
         model = Product
-        fields = ['id', 'title', 'unit_price', 'inventory', 'description', 'collection', 'price_with_tax', 'reviews', 'images']
+        fields = ['id', 'title', 'unit_price', 'inventory', 'description', 'collection', 'price_with_tax', 'reviews_count', 'reviews_url', 'reviews', 'images']
+        expandable_fields = ['reviews']
+        field_columns = {'price_with_tax': ['effective_price']}
 
-    collection = serializers.HyperlinkedRelatedField(
+    collection = CachedHyperlinkedRelatedField(
         queryset=Collection.objects.all(),
         view_name='collection-details'
     )
@@ -50,54 +163,64 @@ class ProductSerializer(serializers.ModelSerializer):
 
     # collection = CollectionSerializer()
 
-    price_with_tax = serializers.SerializerMethodField(method_name='calculated_tax')
+    # Precomputed with promotions and tax applied, see store.pricing.
+    price_with_tax = serializers.DecimalField(
+        source='effective_price', max_digits=8, decimal_places=2, coerce_to_string=False, read_only=True)
 
-    def calculated_tax(self, product: Product):
-        return product.unit_price * Decimal(1.19)
+    def get_reviews_url(self, product: Product):
+        return reverse('review-list', kwargs={'product_pk': product.id}, request=self.context.get('request'))
     
     # def validate(self, data):
     #     if data['password'] != data['confirm_password']:
     #         return serializers.ValidationError('Passwords do not match')
     #     return data
 
+
+def get_product_serializer():
+    # STORE_PRODUCT_SERIALIZER may name a subclass adding fields from other
+    # apps, like core's product tags.
+    return import_string(settings.STORE_PRODUCT_SERIALIZER)
+
     
-class SimpleProductSerializer(serializers.ModelSerializer):
+class SimpleProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ["id", "title", "unit_price"]
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product = SimpleProductSerializer()
 
-    total_price = serializers.SerializerMethodField()
+    # Totals are annotated by CartItem.objects.with_total_price()
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True, coerce_to_string=False)
     class Meta:
         model = CartItem
         fields = ["id", "product", "quantity", "total_price"]
     
-    def get_total_price(self, cartitem: CartItem):
-        return cartitem.quantity * cartitem.product.unit_price
-    
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     class Meta:
         model = Cart
-        fields = ["id", "items", "total_price"]  
+        fields = ["id", "items", "items_count", "total_price"]  
+
+    # Totals are annotated by Cart.objects.with_totals()
+    items_count = serializers.IntegerField(read_only=True)
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True, coerce_to_string=False)
 
-    total_price = serializers.SerializerMethodField()
+    def create(self, validated_data):
+        cart = super().create(validated_data)
+        cart.items_count, cart.total_price = 0, Decimal(0)
+        return cart
 
-    def get_total_price(self, cart: Cart):
-        return sum([item.quantity * item.product.unit_price for item in cart.items.all()])
+class CartSummarySerializer(CartSerializer):
+    class Meta(CartSerializer.Meta):
+        fields = ["id", "items_count", "total_price"]
     
     
     
 class AddCartItemSerializer(serializers.ModelSerializer):
     product_id = serializers.IntegerField()
 
-    def validate_product_id(self, value):
-        if not Product.objects.filter(pk=value).exists():
-            raise serializers.ValidationError('No product with the given ID was found')
-        return value
     class Meta:
         model = CartItem
         fields = ["id", "product_id", "quantity"]
@@ -107,14 +230,10 @@ class AddCartItemSerializer(serializers.ModelSerializer):
         product_id = self.validated_data["product_id"]
         quantity = self.validated_data["quantity"]
 
-        try:
-            cartitem = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-            cartitem.quantity += quantity
-            cartitem.save()
-            self.instance = cartitem
-        except CartItem.DoesNotExist:
-            # self.instance = CartItem.objects.create(cart_id=cart_id, product_id=product_id, quantity=quantity) That is redondant
-            self.instance = CartItem.objects.create(cart_id=cart_id, **self.validated_data)
+        # The product check is part of the upsert statement.
+        self.instance = CartItem.objects.add_quantity(cart_id, product_id, quantity)
+        if self.instance is None:
+            raise serializers.ValidationError({'product_id': ['No product with the given ID was found']})
         return self.instance
 
 class UpdateCartItemSerializer(serializers.ModelSerializer):
@@ -122,30 +241,43 @@ class UpdateCartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ["quantity"]
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_id = serializers.IntegerField(read_only=True)
     class Meta:
         model = Customer
         fields = ['id', 'user_id', 'phone', 'birth_date', 'membership']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product = SimpleProductSerializer()
     class Meta:
         model = OrderItem
         fields = ['id', 'quantity', 'unit_price', 'product']
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     customer = CustomerSerializer()
     items = OrderItemSerializer(many=True)
     class Meta:
         model = Order
         fields = ['id', 'payment_status', 'placed_at', 'customer', 'items']
 
+class OrderSummarySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    items_count = serializers.IntegerField(read_only=True)
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True, coerce_to_string=False)
+    class Meta:
+        model = Order
+        fields = ['id', 'payment_status', 'placed_at', 'customer_id', 'items_count', 'total_price']
+
 class UpdateOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ["payment_status"]
 
+def get_quantities(cart_items):
+    quantities = {}
+    for item in cart_items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
 class CreateOrderSerializer(serializers.Serializer):
     cart_id = serializers.IntegerField()
 
@@ -160,9 +292,16 @@ class CreateOrderSerializer(serializers.Serializer):
        
         with transaction.atomic():
             cart_id = self.validated_data["cart_id"]
-            customer = Customer.objects.get(user_id=self.context["user_id"])
-            order = Order.objects.create(customer = customer)
-            cart_items = CartItem.objects.select_related('product').filter(cart_id=cart_id)
+            # Checked again under the lock, another request may have ordered
+            # the cart since it was validated.
+            if not lock_carts([cart_id]):
+                raise serializers.ValidationError({"cart_id": ["No Cart with the given ID was found."]})
+            cart_items = list(CartItem.objects.select_related('product').filter(cart_id=cart_id))
+            if not cart_items:
+                raise serializers.ValidationError({"cart_id": ["The cart is empty."]})
+            reserve_inventory(get_quantities(cart_items))
+
+            order = Order.objects.create(customer_id=self.context["customer_id"])
             order_items = [
                 OrderItem(
                     order=order, 
@@ -175,3 +314,61 @@ class CreateOrderSerializer(serializers.Serializer):
             OrderItem.objects.bulk_create(order_items)
             Cart.objects.filter(pk=cart_id).delete()
             return order
+
+
+class BatchCreateOrderSerializer(serializers.Serializer):
+    cart_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=100)
+
+    def save(self, **kwargs):
+        cart_ids = list(dict.fromkeys(self.validated_data["cart_ids"]))
+        results = {cart_id: {"cart_id": cart_id} for cart_id in cart_ids}
+
+        with transaction.atomic():
+            # Items are read under the cart locks, so a cart ordered by a
+            # concurrent request is reported missing rather than ordered twice.
+            existing = lock_carts(cart_ids)
+            cart_items = {cart_id: [] for cart_id in cart_ids if cart_id in existing}
+            for item in CartItem.objects.select_related('product').filter(cart_id__in=cart_items):
+                cart_items[item.cart_id].append(item)
+
+            for cart_id in cart_ids:
+                if cart_id not in existing:
+                    results[cart_id]["error"] = "No Cart with the given ID was found."
+                elif not cart_items[cart_id]:
+                    results[cart_id]["error"] = "The cart is empty."
+                    del cart_items[cart_id]
+
+            # Carts are served in request order until a product runs out.
+            inventory = get_locked_inventory(sorted({item.product_id for items in cart_items.values() for item in items}))
+            reserved = {}
+            accepted = []
+            for cart_id, items in cart_items.items():
+                quantities = get_quantities(items)
+                if any(inventory.get(product_id, 0) < quantity for product_id, quantity in quantities.items()):
+                    results[cart_id]["error"] = "Not enough inventory."
+                    continue
+                for product_id, quantity in quantities.items():
+                    inventory[product_id] -= quantity
+                    reserved[product_id] = reserved.get(product_id, 0) + quantity
+                accepted.append(cart_id)
+
+            if accepted:
+                decrement_inventory(reserved)
+
+                orders = [Order(customer_id=self.context["customer_id"]) for _ in accepted]
+                if connection.features.can_return_rows_from_bulk_insert:
+                    Order.objects.bulk_create(orders)
+                else:
+                    for order in orders:
+                        order.save()
+
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product=item.product, unit_price=item.product.unit_price, quantity=item.quantity)
+                    for order, cart_id in zip(orders, accepted) for item in cart_items[cart_id]
+                ])
+                Cart.objects.filter(pk__in=accepted).delete()
+
+                for order, cart_id in zip(orders, accepted):
+                    results[cart_id]["order_id"] = order.id
+
+        return list(results.values())
@@ -1,10 +1,139 @@
 from django.conf import settings
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db import connections, transaction
+from django.db.models import F, Max
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_migrate, post_save, pre_delete, pre_save
 
-from .models import Customer
+from .cache import invalidate
+from .customers import forget_customer_id
+from .models import Collection, Customer, Product, ProductImage, Promotion, Review
+from .pricing import get_effective_price
+from .search import restore_sqlite_triggers
+from .tasks import generate_renditions
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_customer_for_new_user(sender, **kwargs):
     if kwargs["created"]:
-        Customer.objects.create(user=kwargs["instance"])
\ No newline at end of file
+        Customer.objects.create(user=kwargs["instance"])
+
+@receiver(post_init, sender=Customer)
+def remember_customer_user(sender, instance, **kwargs):
+    instance._loaded_user_id = instance.__dict__.get('user_id')
+
+@receiver(post_save, sender=Customer)
+def forget_reassigned_customer(sender, instance, created, **kwargs):
+    # The old user must not keep resolving to this customer.
+    if not created and instance._loaded_user_id not in (None, instance.user_id):
+        forget_customer_id(instance._loaded_user_id)
+    instance._loaded_user_id = instance.user_id
+
+@receiver(post_delete, sender=Customer)
+def forget_deleted_customer(sender, instance, **kwargs):
+    forget_customer_id(instance.user_id)
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    invalidate(sender._meta.model_name)
+
+for model in [Product, Collection, Review, ProductImage, Promotion]:
+    post_save.connect(invalidate_cached_responses, sender=model)
+    post_delete.connect(invalidate_cached_responses, sender=model)
+
+@receiver(m2m_changed, sender=Product.promotions.through)
+def invalidate_product_promotions(sender, **kwargs):
+    if kwargs["action"] in ["post_add", "post_remove", "post_clear"]:
+        invalidate('product')
+
+
+def change_products_count(collection_id, delta):
+    collections = Collection.objects.filter(pk=collection_id)
+    if delta < 0:
+        collections = collections.filter(products_count__gte=-delta)
+    collections.update(products_count=F('products_count') + delta)
+
+@receiver(post_init, sender=Product)
+def remember_product_fields(sender, instance, **kwargs):
+    # __dict__ avoids loading the columns when they were deferred with only().
+    instance._loaded_collection_id = instance.__dict__.get('collection_id')
+    instance._loaded_unit_price = instance.__dict__.get('unit_price')
+
+@receiver(post_save, sender=Product)
+def update_products_count_on_save(sender, instance, created, **kwargs):
+    if kwargs["raw"]:
+        return
+    if created:
+        change_products_count(instance.collection_id, 1)
+    elif instance._loaded_collection_id not in (None, instance.collection_id):
+        change_products_count(instance._loaded_collection_id, -1)
+        change_products_count(instance.collection_id, 1)
+    instance._loaded_collection_id = instance.collection_id
+
+@receiver(post_delete, sender=Product)
+def update_products_count_on_delete(sender, instance, **kwargs):
+    change_products_count(instance.collection_id, -1)
+
+
+@receiver(post_init, sender=ProductImage)
+def remember_product_image(sender, instance, **kwargs):
+    # The descriptor holds a plain name until the file is accessed.
+    image = instance.__dict__.get('image')
+    instance._loaded_image = getattr(image, 'name', image)
+
+@receiver(post_save, sender=ProductImage)
+def queue_image_renditions(sender, instance, created, **kwargs):
+    if kwargs["raw"] or not instance.image:
+        return
+    if created or instance.image.name != instance._loaded_image:
+        # The worker must see the committed row and file.
+        transaction.on_commit(lambda: generate_renditions.delay(instance.id))
+    instance._loaded_image = instance.image.name
+
+
+@receiver(pre_save, sender=Product)
+def update_effective_price(sender, instance, raw, **kwargs):
+    if raw or 'unit_price' not in instance.__dict__:
+        return
+    if instance._state.adding:
+        discount = None
+    elif instance.unit_price == instance._loaded_unit_price:
+        return
+    else:
+        discount = instance.promotions.aggregate(best=Max('discount'))['best']
+    instance.effective_price = get_effective_price(instance.unit_price, discount)
+
+@receiver(post_save, sender=Product)
+def save_effective_price(sender, instance, raw, update_fields, **kwargs):
+    # save(update_fields=['unit_price']) leaves the new price out.
+    if not raw and update_fields is not None and 'unit_price' in update_fields \
+            and 'effective_price' not in update_fields:
+        Product.objects.refresh_effective_prices([instance.pk])
+    instance._loaded_unit_price = instance.__dict__.get('unit_price')
+
+@receiver(m2m_changed, sender=Product.promotions.through)
+def update_promoted_prices(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_product_ids = list(instance.product_set.values_list('id', flat=True))
+    elif action in ['post_add', 'post_remove']:
+        Product.objects.refresh_effective_prices(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        Product.objects.refresh_effective_prices(instance._cleared_product_ids if reverse else [instance.pk])
+
+@receiver(post_save, sender=Promotion)
+def update_promotion_prices(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        Product.objects.refresh_effective_prices(instance.product_set.values('id'))
+
+@receiver(pre_delete, sender=Promotion)
+def remember_promoted_products(sender, instance, **kwargs):
+    # The links are gone by post_delete.
+    instance._product_ids = list(instance.product_set.values_list('id', flat=True))
+
+@receiver(post_delete, sender=Promotion)
+def update_unpromoted_prices(sender, instance, **kwargs):
+    Product.objects.refresh_effective_prices(instance._product_ids)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'store':
+        restore_sqlite_triggers(connections[using])
@@ -0,0 +1,69 @@
+import os
+from io import BytesIO
+
+from celery import shared_task
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .cache import invalidate
+from .models import ProductImage
+
+
+RENDITION_WIDTHS = [160, 320, 640]
+
+# Pillow format, file extension, save options
+RENDITION_FORMATS = [
+    ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    ('JPEG', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+]
+
+RENDITION_MIME_TYPES = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+
+
+def get_rendition_widths(width):
+    # Never upscale: an image narrower than every rendition keeps its size.
+    return [rendition_width for rendition_width in RENDITION_WIDTHS if rendition_width < width] or [width]
+
+
+def save_rendition(image, name, format, options):
+    buffer = BytesIO()
+    image.save(buffer, format, **options)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+@shared_task
+def generate_renditions(product_image_id):
+    product_image = ProductImage.objects.filter(pk=product_image_id).first()
+    if product_image is None or not product_image.image:
+        return
+
+    stem, _ = os.path.splitext(os.path.basename(product_image.image.name))
+    renditions = []
+
+    with product_image.image.open('rb') as file, Image.open(file) as original:
+        # For JPEGs, draft() lets the decoder scale down by 1/2, 1/4 or 1/8
+        # while reading, so a large upload is never decoded at full size.
+        original.draft('RGB', (max(RENDITION_WIDTHS), max(RENDITION_WIDTHS)))
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+        for width in get_rendition_widths(image.width):
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            for format, extension, options in RENDITION_FORMATS:
+                name = f'store/images/renditions/{stem}-{width}w.{extension}'
+                renditions.append({
+                    'path': save_rendition(resized, name, format, options),
+                    'format': extension,
+                    'width': width,
+                    'height': height,
+                })
+
+    # update() rather than save(), so the post_save hook does not queue
+    # this task again.
+    stale = product_image.renditions
+    ProductImage.objects.filter(pk=product_image_id).update(renditions=renditions)
+    invalidate('productimage')
+
+    for rendition in stale:
+        default_storage.delete(rendition['path'])
@@ -0,0 +1,207 @@
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+import pytest
+
+from tags.models import Tag, TaggedItem
+
+from store.models import Cart, CartItem, Collection, Customer, Order, OrderItem, Product, ProductImage, Review
+
+
+BASELINES_PATH = Path(__file__).with_name('benchmarks.json')
+
+benchmark_results = {}
+
+benchmark_notes = []
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Rolled-back test data does not bump the response cache generations.
+    cache.clear()
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def product():
+    collection = Collection.objects.create(title='a')
+    return Product.objects.create(title='a', description='', unit_price=10, inventory=5, collection=collection)
+
+
+@pytest.fixture
+def seed_catalog():
+    def seed(scale):
+        # Every relation grows with `scale`, so that an N+1 on any of them
+        # shows up as a growing query count between two scales.
+        User = get_user_model()
+        run = Collection.objects.count()
+
+        collections = Collection.objects.bulk_create([
+            Collection(title=f'collection {run}-{index}') for index in range(max(1, scale // 5))
+        ])
+        products = Product.objects.bulk_create([
+            Product(
+                title=f'product {index:05}',
+                description=f'description of product {index}',
+                unit_price=10 + index % 90,
+                inventory=index % 7 * 10,
+                collection=collections[index % len(collections)],
+            )
+            for index in range(scale)
+        ])
+        # bulk_create skips the signals that maintain the counter and prices.
+        Collection.objects.reconcile_products_count()
+        Product.objects.refresh_effective_prices()
+        images = ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'store/images/{product.id}-{index}.jpg')
+            for product in products for index in range(2)
+        ])
+        tags = Tag.objects.bulk_create([Tag(label=f'tag {run}-{index}') for index in range(max(1, scale // 5))])
+        product_type = ContentType.objects.get_for_model(Product)
+        TaggedItem.objects.bulk_create([
+            TaggedItem(tag=tags[(product.id + offset) % len(tags)], content_type=product_type, object_id=product.id)
+            for product in products for offset in range(min(2, len(tags)))
+        ])
+        reviews = Review.objects.bulk_create([
+            Review(product=product, name=f'reviewer {index}', description='great')
+            for product in products for index in range(3)
+        ])
+
+        users = User.objects.bulk_create([
+            User(username=f'user-{run}-{index}', email=f'user-{run}-{index}@example.com')
+            for index in range(scale)
+        ])
+        customers = Customer.objects.bulk_create([Customer(user=user, phone='555') for user in users])
+        orders = Order.objects.bulk_create([Order(customer=customer) for customer in customers])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[(index + offset) % scale], quantity=1, unit_price=10)
+            for index, order in enumerate(orders) for offset in range(3)
+        ])
+
+        cart = Cart.objects.create()
+        cart_items = CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=2) for product in products
+        ])
+
+        staff = User.objects.create(
+            username=f'staff-{run}', email=f'staff-{run}@example.com', is_staff=True)
+
+        return SimpleNamespace(
+            scale=scale,
+            collection=collections[0],
+            product=products[0],
+            tag=tags[0],
+            image=images[0],
+            review=reviews[0],
+            customer=customers[0],
+            order=orders[0],
+            cart=cart,
+            cart_item=cart_items[0],
+            staff=staff,
+        )
+
+    return seed
+
+
+@pytest.fixture
+def measure():
+    def run(client, method, url, repeat=5, **kwargs):
+        call = getattr(client, method)
+
+        # Queries are counted on a cold cache, like the first request after
+        # an invalidation, which is the path that matters for N+1 checks.
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = call(url, **kwargs)
+        # captured_queries is read lazily from the connection log, which the
+        # following requests reset, so count it now.
+        queries = len(context.captured_queries)
+
+        timings = []
+        for _ in range(repeat):
+            cache.clear()
+            start = time.perf_counter()
+            call(url, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        cache.clear()
+        tracemalloc.start()
+        call(url, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        return SimpleNamespace(
+            response=response,
+            queries=queries,
+            p50=statistics.median(timings),
+            p95=timings[min(len(timings) - 1, round(len(timings) * 0.95))],
+            peak_kb=peak / 1024,
+        )
+
+    return run
+
+
+def load_baselines():
+    if not BASELINES_PATH.exists():
+        return {}
+    return json.loads(BASELINES_PATH.read_text())
+
+
+@pytest.fixture(scope='session')
+def benchmark_baselines():
+    return load_baselines()
+
+
+@pytest.fixture
+def record_benchmark():
+    def record(name, results):
+        benchmark_results[name] = results
+    return record
+
+
+@pytest.fixture
+def benchmark_note():
+    def note(text):
+        benchmark_notes.append(text)
+    return note
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if benchmark_results and os.environ.get('STORE_BENCHMARK_UPDATE'):
+        baselines = load_baselines()
+        for name, results in benchmark_results.items():
+            baselines[name] = {'queries': results[-1]['queries']}
+        BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not benchmark_results and not benchmark_notes:
+        return
+    terminalreporter.section('store benchmarks')
+    for text in benchmark_notes:
+        terminalreporter.write_line(text)
+    if not benchmark_results:
+        return
+    terminalreporter.write_line(
+        f'{"route":<28}{"scale":>7}{"queries":>9}{"p50 ms":>10}{"p95 ms":>10}{"peak KB":>10}')
+    for name, results in sorted(benchmark_results.items()):
+        for result in results:
+            terminalreporter.write_line(
+                f'{name:<28}{result["scale"]:>7}{result["queries"]:>9}'
+                f'{result["p50"]:>10.2f}{result["p95"]:>10.2f}{result["peak_kb"]:>10.1f}')
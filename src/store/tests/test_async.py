@@ -0,0 +1,96 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+import pytest
+
+
+ROUTES = [
+    '/products/?page_size=5',
+    '/products/?page_size=5&expand=reviews,tags&fields=id,title,reviews,tags,images',
+    '/products/?search=product&facets=true&fields=id',
+    '/products/{product.id}/',
+    '/collections/',
+    '/collections/{collection.id}/',
+    '/products/{product.id}/reviews/',
+    '/products/{product.id}/reviews/{review.id}/',
+    '/products/{product.id}/images/',
+    '/products/{product.id}/images/{image.id}/',
+]
+
+
+def get_async(url, headers=None):
+    return async_to_sync(AsyncClient().get)(url, headers=headers)
+
+
+def get_body(response):
+    body = json.loads(response.content)
+    if isinstance(body, dict):
+        # Page links point at the path that was requested.
+        body.pop('next', None)
+        body.pop('previous', None)
+    return body
+
+
+@pytest.mark.django_db
+class TestAsyncCatalog:
+    @pytest.mark.parametrize('url', ROUTES)
+    def test_matches_the_sync_endpoint(self, url, seed_catalog, api_client):
+        catalog = seed_catalog(10)
+        url = url.format(**vars(catalog))
+        headers = {'Authorization': f'JWT {AccessToken.for_user(catalog.staff)}'}
+
+        expected = api_client.get('/store' + url, headers=headers)
+        response = get_async('/store/async' + url, headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert get_body(response) == get_body(expected)
+
+    @pytest.mark.parametrize('url', ['/products/', '/products/{product.id}/'])
+    def test_renders_the_browsable_api(self, url, seed_catalog):
+        catalog = seed_catalog(5)
+        headers = {'Authorization': f'JWT {AccessToken.for_user(catalog.staff)}', 'Accept': 'text/html'}
+
+        response = get_async('/store/async' + url.format(**vars(catalog)), headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/html')
+
+    def test_if_user_is_anonymous_collections_return_401(self, seed_catalog):
+        seed_catalog(5)
+
+        response = get_async('/store/async/collections/')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_product_does_not_exist_returns_404(self, seed_catalog):
+        seed_catalog(5)
+
+        response = get_async('/store/async/products/0/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_second_request_is_served_from_the_cache(self, seed_catalog):
+        seed_catalog(5)
+        first = get_async('/store/async/products/')
+
+        with CaptureQueriesContext(connection) as context:
+            second = get_async('/store/async/products/')
+        queries = len(context.captured_queries)
+
+        assert queries == 0
+        assert second.content == first.content
+
+    def test_matching_etag_returns_304(self, seed_catalog):
+        catalog = seed_catalog(5)
+        url = f'/store/async/products/{catalog.product.id}/'
+        etag = get_async(url)['ETag']
+
+        response = get_async(url, headers={'If-None-Match': etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
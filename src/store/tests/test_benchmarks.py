@@ -0,0 +1,168 @@
+import os
+import statistics
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+import pytest
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+from core.tokens import RefreshToken
+
+
+# Run with: pytest --ds=storefront.settings.test -m benchmark
+# STORE_BENCHMARK_SCALES sets the catalog sizes (default "5,20"), and
+# STORE_BENCHMARK_UPDATE=1 rewrites benchmarks.json from the largest scale.
+SCALES = [int(scale) for scale in os.environ.get('STORE_BENCHMARK_SCALES', '5,20').split(',')]
+
+# name, method, url, user ('staff', 'customer' or None)
+# POST /store/customers/ is left out: its serializer cannot set the user.
+ROUTES = [
+    ('product-list', 'get', '/store/products/?page_size=100', None),
+    ('product-list-expanded', 'get', '/store/products/?page_size=100&expand=reviews', None),
+    ('product-list-sparse', 'get', '/store/products/?page_size=100&fields=id,title,unit_price,collection', None),
+    ('product-list-by-price', 'get', '/store/products/?page_size=100&ordering=-price&fields=id,title,price_with_tax', None),
+    ('product-search', 'get', '/store/products/?page_size=100&search=product', None),
+    ('product-facets', 'get', '/store/products/?page_size=100&fields=id&in_stock=true&facets=true', None),
+    ('product-list-tagged', 'get', '/store/products/?page_size=100&expand=tags', None),
+    ('tag-products', 'get', '/tags/{tag.id}/products/?page_size=100&fields=id,title', None),
+    ('product-details', 'get', '/store/products/{product.id}/', None),
+    ('collection-list', 'get', '/store/collections/', 'staff'),
+    ('collection-details', 'get', '/store/collections/{collection.id}/', None),
+    ('review-list', 'get', '/store/products/{product.id}/reviews/', None),
+    ('review-details', 'get', '/store/products/{product.id}/reviews/{review.id}/', None),
+    ('image-list', 'get', '/store/products/{product.id}/images/', None),
+    ('image-details', 'get', '/store/products/{product.id}/images/{image.id}/', None),
+    ('cart-create', 'post', '/store/carts/', None),
+    ('cart-details', 'get', '/store/carts/{cart.id}/', None),
+    ('cart-details-sparse', 'get', '/store/carts/{cart.id}/?fields=id,total_price', None),
+    ('cart-details-summary', 'get', '/store/carts/{cart.id}/?summary=true', None),
+    ('cart-item-list', 'get', '/store/carts/{cart.id}/items/', None),
+    ('cart-item-details', 'get', '/store/carts/{cart.id}/items/{cart_item.id}/', None),
+    ('customer-details', 'get', '/store/customers/{customer.id}/', None),
+    ('customer-me', 'get', '/store/customers/me/', 'customer'),
+    ('order-list', 'get', '/store/orders/?page_size=100', 'staff'),
+    ('order-list-summary', 'get', '/store/orders/?page_size=100&summary=true', 'staff'),
+    ('order-details', 'get', '/store/orders/{order.id}/', 'staff'),
+]
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize('name,method,url,user', ROUTES, ids=[route[0] for route in ROUTES])
+def test_route_queries_do_not_grow_with_catalog(
+        name, method, url, user, api_client, seed_catalog, measure, benchmark_baselines, record_benchmark):
+    results = []
+
+    for scale in SCALES:
+        # Each scale is seeded in a savepoint that is rolled back afterwards.
+        with transaction.atomic():
+            catalog = seed_catalog(scale)
+            if user == 'staff':
+                api_client.force_authenticate(user=catalog.staff)
+            elif user == 'customer':
+                api_client.force_authenticate(user=catalog.customer.user)
+
+            result = measure(api_client, method, url.format(**vars(catalog)))
+            assert result.response.status_code < status.HTTP_400_BAD_REQUEST
+
+            results.append({
+                'scale': scale,
+                'queries': result.queries,
+                'p50': result.p50,
+                'p95': result.p95,
+                'peak_kb': result.peak_kb,
+            })
+            transaction.set_rollback(True)
+
+    record_benchmark(name, results)
+
+    counts = [result['queries'] for result in results]
+    assert len(set(counts)) == 1, f'{name}: query count grows with the catalog size {dict(zip(SCALES, counts))}'
+
+    baseline = benchmark_baselines.get(name)
+    if baseline is not None and not os.environ.get('STORE_BENCHMARK_UPDATE'):
+        assert counts[-1] <= baseline['queries'], \
+            f'{name}: {counts[-1]} queries, baseline is {baseline["queries"]}'
+
+
+RENDER_ROUTES = [
+    ('product-list', '/store/products/?page_size=100&expand=reviews', None),
+    ('order-list', '/store/orders/?page_size=100', 'staff'),
+]
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize('name,url,user', RENDER_ROUTES, ids=[route[0] for route in RENDER_ROUTES])
+def test_renderers(name, url, user, api_client, seed_catalog, benchmark_note):
+    catalog = seed_catalog(max(SCALES))
+    if user == 'staff':
+        api_client.force_authenticate(user=catalog.staff)
+    data = api_client.get(url).data
+
+    for renderer in [JSONRenderer(), ORJSONRenderer(), MessagePackRenderer()]:
+        timings = []
+        for _ in range(20):
+            start = time.perf_counter()
+            content = renderer.render(data)
+            timings.append((time.perf_counter() - start) * 1000)
+        benchmark_note(
+            f'render {name:<14}{type(renderer).__name__:<22}'
+            f'{statistics.median(timings):>8.3f} ms{len(content):>9} bytes')
+
+
+AUTH_ROUTES = [
+    ('customer-me', '/store/customers/me/'),
+    ('order-list', '/store/orders/?page_size=100'),
+    ('order-list-summary', '/store/orders/?page_size=100&summary=true'),
+]
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize('name,url', AUTH_ROUTES, ids=[route[0] for route in AUTH_ROUTES])
+def test_authentication(name, url, api_client, seed_catalog, benchmark_note):
+    # A token without claims, on a cold cache, costs what the stock
+    # JWTAuthentication does: the user row, then the customer.
+    user = seed_catalog(max(SCALES)).customer.user
+    tokens = {'row': AccessToken.for_user(user), 'claims': RefreshToken.for_user(user).access_token}
+    counts = {}
+
+    for kind, token in tokens.items():
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(url, HTTP_AUTHORIZATION=f'JWT {token}')
+        assert response.status_code == status.HTTP_200_OK
+        counts[kind] = len(context.captured_queries)
+
+    benchmark_note(f'auth {name:<20}user row {counts["row"]:>3} queries   claims {counts["claims"]:>3} queries')
+    assert counts['claims'] < counts['row']
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_query_instrumentation_overhead(seed_catalog, measure, settings, benchmark_note):
+    # The same route with and without core.middleware.QueryInstrumentationMiddleware,
+    # on a client built after each MIDDLEWARE change.
+    seed_catalog(max(SCALES))
+    url = '/store/products/?page_size=100&expand=reviews'
+    middleware = 'core.middleware.QueryInstrumentationMiddleware'
+    results = {}
+
+    for kind in ['without', 'with']:
+        settings.MIDDLEWARE = [name for name in settings.MIDDLEWARE if name != middleware]
+        if kind == 'with':
+            settings.MIDDLEWARE = [middleware, *settings.MIDDLEWARE]
+        results[kind] = measure(APIClient(), 'get', url, repeat=20)
+
+    benchmark_note(
+        f'query instrumentation  without {results["without"].p50:>8.2f} ms   '
+        f'with {results["with"].p50:>8.2f} ms   '
+        f'overhead {results["with"].p50 - results["without"].p50:>6.2f} ms')
+    assert results['with'].queries == results['without'].queries
@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils.http import http_date
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+import pytest
+
+from store.models import Review
+
+
+@pytest.mark.django_db
+class TestCachedCatalog:
+    def test_repeated_get_is_served_from_cache(self, api_client, product):
+        first = api_client.get(f'/store/products/{product.id}/')
+
+        with CaptureQueriesContext(connection) as context:
+            second = api_client.get(f'/store/products/{product.id}/')
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.content == first.content
+        assert len(context.captured_queries) == 0
+
+    def test_saving_a_product_invalidates_the_cache(self, api_client, product):
+        api_client.get(f'/store/products/{product.id}/')
+
+        product.title = 'b'
+        product.save()
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        assert response.json()['title'] == 'b'
+
+    def test_adding_a_review_invalidates_the_product_list(self, api_client, product):
+        api_client.get('/store/products/')
+
+        Review.objects.create(product=product, name='a', description='a')
+        response = api_client.get('/store/products/')
+
+        assert response.json()['results'][0]['reviews_count'] == 1
+
+    def test_renaming_a_product_invalidates_its_reviews(self, api_client, product):
+        Review.objects.create(product=product, name='a', description='a')
+        api_client.get(f'/store/products/{product.id}/reviews/')
+
+        product.title = 'b'
+        product.save()
+        response = api_client.get(f'/store/products/{product.id}/reviews/')
+
+        assert response.json()[0]['product'] == 'b'
+
+    def test_accept_header_is_part_of_the_key(self, api_client, product):
+        api_client.get(f'/store/products/{product.id}/', HTTP_ACCEPT='application/json')
+
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_ACCEPT='text/html')
+
+        assert response['Content-Type'].startswith('text/html')
+
+    def test_html_of_a_staff_user_is_not_served_to_others(self, api_client, product):
+        staff = get_user_model().objects.create(username='staff-user', email='staff@example.com', is_staff=True)
+        api_client.force_authenticate(user=staff)
+        api_client.get(f'/store/products/{product.id}/', HTTP_ACCEPT='text/html')
+
+        response = APIClient().get(f'/store/products/{product.id}/', HTTP_ACCEPT='text/html')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b'staff-user' not in response.content
+
+
+@pytest.mark.django_db
+class TestConditionalRequests:
+    def test_matching_etag_returns_304_without_queries(self, api_client, product):
+        etag = api_client.get(f'/store/products/{product.id}/')['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+        assert response['ETag'] == etag
+        assert len(context.captured_queries) == 0
+
+    def test_saving_a_product_changes_the_etag(self, api_client, product):
+        etag = api_client.get(f'/store/products/{product.id}/')['ETag']
+
+        product.save()
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_changes_without_last_update_change_the_etag(self, api_client, product):
+        etag = api_client.get('/store/products/')['ETag']
+
+        Review.objects.create(product=product, name='a', description='a')
+        response = api_client.get('/store/products/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_list_etag_depends_on_the_filters(self, api_client, product):
+        etag = api_client.get('/store/products/')['ETag']
+
+        response = api_client.get('/store/products/?in_stock=false', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_modified_since_returns_304(self, api_client, product):
+        last_modified = api_client.get('/store/products/')['Last-Modified']
+
+        response = api_client.get('/store/products/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_modified_since_before_last_update_returns_200(self, api_client, product):
+        since = http_date(product.last_update.timestamp() - 60)
+
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_MODIFIED_SINCE=since)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_missing_product_returns_404(self, api_client):
+        response = api_client.get('/store/products/0/', HTTP_IF_NONE_MATCH='*')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_collection_returns_304_without_queries(self, api_client, product):
+        etag = api_client.get(f'/store/collections/{product.collection_id}/')['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(f'/store/collections/{product.collection_id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert len(context.captured_queries) == 0
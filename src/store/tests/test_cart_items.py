@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+import pytest
+
+from store.models import Cart, CartItem
+
+
+@pytest.mark.django_db
+class TestAddCartItem:
+    def test_adding_twice_increments_the_quantity(self, api_client, product):
+        cart = Cart.objects.create()
+
+        api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id, 'quantity': 2})
+        response = api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id, 'quantity': 3})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['quantity'] == 5
+        assert CartItem.objects.get(cart=cart).quantity == 5
+
+    def test_add_runs_a_single_query(self, api_client, product):
+        cart = Cart.objects.create()
+
+        with CaptureQueriesContext(connection) as context:
+            api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id, 'quantity': 1})
+
+        assert len(context.captured_queries) == 1
+
+    def test_if_product_does_not_exist_returns_400(self, api_client, product):
+        cart = Cart.objects.create()
+
+        response = api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id + 1, 'quantity': 1})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'product_id' in response.data
+        assert not CartItem.objects.exists()
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_adds_do_not_lose_increments(product):
+    cart = Cart.objects.create()
+    workers, adds = 8, 25
+
+    def add_items(_):
+        client = APIClient()
+        try:
+            for _ in range(adds):
+                response = client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id, 'quantity': 1})
+                assert response.status_code == status.HTTP_201_CREATED
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(add_items, range(workers)))
+
+    assert CartItem.objects.get(cart=cart).quantity == workers * adds
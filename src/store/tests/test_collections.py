@@ -1,7 +1,11 @@
+from django.core.management import call_command
 from rest_framework import status
 from rest_framework.test import APIClient
 import pytest
 
+from store.models import Collection, Product
+
+
 @pytest.mark.django_db
 class TestCreateCollection:
     def test_if_user_anonumous_returns_401(self):
@@ -15,3 +19,33 @@ class TestCreateCollection:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+def create_product(collection):
+    return Product.objects.create(title='a', description='', unit_price=10, inventory=1, collection=collection)
+
+
+@pytest.mark.django_db
+class TestProductsCount:
+    def test_follows_product_changes(self):
+        first = Collection.objects.create(title='a')
+        second = Collection.objects.create(title='b')
+
+        product = create_product(first)
+        create_product(first)
+        product.collection = second
+        product.save()
+        Product.objects.only('id', 'title').get(pk=product.pk).save()
+        create_product(second).delete()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.products_count, second.products_count) == (1, 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        collection = Collection.objects.create(title='a')
+        create_product(collection)
+        Collection.objects.update(products_count=7)
+
+        call_command('reconcile_products_count')
+
+        collection.refresh_from_db()
+        assert collection.products_count == 1
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+import pytest
+
+from store.models import Customer, Order
+
+
+def create_user(username):
+    return get_user_model().objects.create(username=username, email=f'{username}@example.com')
+
+
+def authenticated_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.mark.django_db
+class TestCustomerResolution:
+    def test_current_customer_is_loaded_in_one_query(self):
+        user = create_user('a')
+        client = authenticated_client(user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/store/customers/me/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['id'] == user.customer.id
+        assert len(context.captured_queries) == 1
+
+    def test_customer_id_is_cached_across_requests(self):
+        client = authenticated_client(create_user('a'))
+        counts = []
+
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get('/store/orders/')
+            assert response.status_code == status.HTTP_200_OK
+            counts.append(len(context.captured_queries))
+
+        assert counts[1] == counts[0] - 1
+
+    def test_reassigned_customer_is_not_resolved_for_the_old_user(self):
+        first, second = create_user('a'), create_user('b')
+        client = authenticated_client(first)
+        client.get('/store/orders/')
+
+        second.customer.delete()
+        customer = Customer.objects.get(user=first)
+        customer.user = second
+        customer.save()
+        Order.objects.create(customer=customer)
+        response = client.get('/store/orders/')
+
+        assert response.data['results'] == []
+
+    def test_a_user_has_a_single_customer(self):
+        user = create_user('a')
+
+        with pytest.raises(IntegrityError):
+            Customer.objects.create(user=user)
@@ -0,0 +1,72 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework import status
+import pytest
+
+from store.models import ProductImage
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+def make_upload(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+@pytest.mark.django_db
+class TestImageRenditions:
+    def test_upload_generates_renditions(self, api_client, product, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(
+                f'/store/products/{product.id}/images/', {'image': make_upload(800, 600)}, format='multipart')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        renditions = ProductImage.objects.get().renditions
+        assert sorted({(r['width'], r['height']) for r in renditions}) == [(160, 120), (320, 240), (640, 480)]
+        assert {r['format'] for r in renditions} == {'webp', 'jpg'}
+
+    def test_srcset_lists_renditions_per_format(self, api_client, product, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post(f'/store/products/{product.id}/images/', {'image': make_upload(400, 400)}, format='multipart')
+
+        image = api_client.get(f'/store/products/{product.id}/').data['images'][0]
+
+        assert set(image['srcset']) == {'image/webp', 'image/jpeg'}
+        assert image['srcset']['image/webp'].endswith('320w')
+        assert '640w' not in image['srcset']['image/jpeg']
+
+
+@pytest.mark.django_db
+class TestImageUploadValidation:
+    def post(self, api_client, product, upload):
+        return api_client.post(f'/store/products/{product.id}/images/', {'image': upload}, format='multipart')
+
+    def test_if_file_is_not_an_image_returns_400(self, api_client, product):
+        upload = SimpleUploadedFile('photo.jpg', b'GIF? no, plain text', content_type='image/jpeg')
+
+        response = self.post(api_client, product, upload)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'image' in response.data
+        assert not ProductImage.objects.exists()
+
+    def test_if_file_is_too_large_returns_400(self, api_client, product):
+        header = make_upload(10, 10).read()
+        upload = SimpleUploadedFile('photo.jpg', header + b'\0' * 60 * 1024, content_type='image/jpeg')
+
+        response = self.post(api_client, product, upload)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'KB' in response.data['image'][0]
+
+    def test_if_image_is_too_wide_returns_400(self, api_client, product):
+        response = self.post(api_client, product, make_upload(5000, 10))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'px' in response.data['image'][0]
@@ -0,0 +1,184 @@
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+import pytest
+
+from store.models import Cart, CartItem, Order
+from store.serializers import BatchCreateOrderSerializer, CreateOrderSerializer
+
+
+@pytest.fixture
+def create_cart():
+    def create(product, quantity):
+        cart = Cart.objects.create()
+        CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        return cart
+    return create
+
+
+@pytest.fixture
+def customer_client():
+    def create(username):
+        user = get_user_model().objects.create(username=username, email=f'{username}@example.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+    return create
+
+
+@pytest.mark.django_db
+class TestCreateOrder:
+    def test_placing_an_order_decrements_inventory(self, product, create_cart, customer_client):
+        cart = create_cart(product, 3)
+
+        response = customer_client('a').post('/store/orders/', {'cart_id': cart.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        product.refresh_from_db()
+        assert product.inventory == 2
+
+    def test_if_stock_is_short_returns_400(self, product, create_cart, customer_client):
+        cart = create_cart(product, 6)
+
+        response = customer_client('a').post('/store/orders/', {'cart_id': cart.id})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'inventory' in response.data
+        assert not Order.objects.exists()
+        assert Cart.objects.filter(pk=cart.id).exists()
+        product.refresh_from_db()
+        assert product.inventory == 5
+
+    def test_a_cart_ordered_since_validation_is_not_ordered_again(self, product, create_cart, customer_client):
+        cart = create_cart(product, 2)
+        serializer = CreateOrderSerializer(data={'cart_id': cart.id}, context={'customer_id': None})
+        serializer.is_valid(raise_exception=True)
+
+        customer_client('a').post('/store/orders/', {'cart_id': cart.id})
+        with pytest.raises(ValidationError):
+            serializer.save()
+
+        assert Order.objects.count() == 1
+        product.refresh_from_db()
+        assert product.inventory == 3
+
+
+@pytest.mark.django_db
+class TestListOrders:
+    def test_summary_totals_are_numbers_like_cart_totals(self, product, create_cart, customer_client):
+        client = customer_client('a')
+        cart = create_cart(product, 2)
+        cart_total = client.get(f'/store/carts/{cart.id}/?summary=true').json()['total_price']
+        client.post('/store/orders/', {'cart_id': cart.id})
+
+        [order] = client.get('/store/orders/?summary=true').json()['results']
+
+        assert order['total_price'] == cart_total == 20
+
+    def test_pages_keep_sub_millisecond_timestamps(self):
+        user = get_user_model().objects.create(username='a', email='a@example.com', is_staff=True)
+        placed_at = datetime(2024, 1, 2, 3, 4, 5, 123000, tzinfo=timezone.utc)
+        for index in range(6):
+            order = Order.objects.create(customer=user.customer)
+            Order.objects.filter(pk=order.pk).update(placed_at=placed_at + timedelta(microseconds=index * 100))
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = '/store/orders/?page_size=2&fields=id'
+        ids = []
+
+        while url:
+            response = client.get(url)
+            ids += [order['id'] for order in response.data['results']]
+            url = response.data['next']
+
+        assert ids == list(Order.objects.order_by('-placed_at', '-id').values_list('id', flat=True))
+
+
+@pytest.mark.django_db
+class TestBatchCreateOrders:
+    def test_reports_each_cart(self, product, create_cart, customer_client):
+        valid = create_cart(product, 2)
+        empty = Cart.objects.create()
+        too_large = create_cart(product, 4)
+
+        response = customer_client('a').post(
+            '/store/orders/batch/', {'cart_ids': [valid.id, empty.id, 0, too_large.id]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        results = {result['cart_id']: result for result in response.data['results']}
+        assert 'order_id' in results[valid.id]
+        assert results[empty.id]['error'] == 'The cart is empty.'
+        assert results[0]['error'] == 'No Cart with the given ID was found.'
+        assert results[too_large.id]['error'] == 'Not enough inventory.'
+        assert list(Order.objects.get().items.values_list('quantity', flat=True)) == [2]
+        assert not Cart.objects.filter(pk=valid.id).exists()
+        product.refresh_from_db()
+        assert product.inventory == 3
+
+    def test_query_count_does_not_depend_on_cart_count(self, product, create_cart, customer_client, settings):
+        # Every request looks the customer up.
+        settings.STORE_CUSTOMER_CACHE_TIMEOUT = 0
+        product.inventory = 100
+        product.save()
+        client = customer_client('a')
+        counts = []
+
+        for size in [2, 10]:
+            cart_ids = [create_cart(product, 1).id for _ in range(size)]
+            with CaptureQueriesContext(connection) as context:
+                client.post('/store/orders/batch/', {'cart_ids': cart_ids}, format='json')
+            counts.append(len(context.captured_queries))
+
+        assert counts[0] == counts[1]
+
+    def test_carts_ordered_since_validation_are_not_ordered_again(self, product, create_cart, customer_client):
+        ordered, other = create_cart(product, 2), create_cart(product, 1)
+        customer = get_user_model().objects.create(username='b', email='b@example.com').customer
+        serializer = BatchCreateOrderSerializer(
+            data={'cart_ids': [ordered.id, other.id]}, context={'customer_id': customer.id})
+        serializer.is_valid(raise_exception=True)
+
+        customer_client('a').post('/store/orders/', {'cart_id': ordered.id})
+        results = {result['cart_id']: result for result in serializer.save()}
+
+        assert results[ordered.id]['error'] == 'No Cart with the given ID was found.'
+        assert 'order_id' in results[other.id]
+        product.refresh_from_db()
+        assert product.inventory == 2
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_popular_product_is_never_oversold(product, create_cart, customer_client, benchmark_note):
+    workers, orders = 8, 40
+    product.inventory = orders // 2
+    product.save()
+    requests = [(customer_client(f'customer-{index}'), create_cart(product, 1)) for index in range(orders)]
+
+    def place_order(request):
+        client, cart = request
+        try:
+            return client.post('/store/orders/', {'cart_id': cart.id}).status_code
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = list(executor.map(place_order, requests))
+    elapsed = time.perf_counter() - start
+
+    benchmark_note(
+        f'order contention: {orders} orders for one product from {workers} threads '
+        f'in {elapsed:.2f}s ({orders / elapsed:.1f} orders/s)')
+
+    assert statuses.count(status.HTTP_200_OK) == orders // 2
+    assert statuses.count(status.HTTP_400_BAD_REQUEST) == orders // 2
+    product.refresh_from_db()
+    assert product.inventory == 0
@@ -0,0 +1,269 @@
+import json
+from base64 import b64encode
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+import msgpack
+import pytest
+
+from store.models import Collection, Product, Promotion
+
+
+@pytest.fixture
+def products():
+    collection = Collection.objects.create(title='a')
+    # Duplicate titles force the paginator to break ties on id.
+    return [
+        Product.objects.create(
+            title=f'product {index // 3}', description='', unit_price=10, inventory=1, collection=collection)
+        for index in range(25)
+    ]
+
+
+@pytest.mark.django_db
+class TestListProducts:
+    def test_pages_cover_every_product_once(self, products):
+        client = APIClient()
+        url = '/store/products/?page_size=4'
+        ids = []
+
+        while url:
+            response = client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            ids += [product['id'] for product in response.data['results']]
+            url = response.data['next']
+
+        expected = Product.objects.order_by('title', 'id').values_list('id', flat=True)
+        assert ids == list(expected)
+
+    def test_previous_link_returns_the_previous_page(self, products):
+        client = APIClient()
+        first = client.get('/store/products/?page_size=4')
+        second = client.get(first.data['next'])
+
+        response = client.get(second.data['previous'])
+
+        assert response.data['results'] == first.data['results']
+        assert response.data['previous'] is None
+
+    def test_if_page_size_is_invalid_uses_default(self, products):
+        response = APIClient().get('/store/products/?page_size=abc')
+
+        assert len(response.data['results']) == 10
+
+    def test_if_cursor_is_invalid_returns_404(self, products):
+        response = APIClient().get('/store/products/?cursor=not-a-cursor')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize('cursor', [
+        {'o': ['title', 'id'], 'p': ['a', 'abc']},
+        {'o': ['title', 'id'], 'p': [None, None], 'r': 1},
+        {'o': ['title', 'id'], 'p': [['a'], {}]},
+        {'p': ['a', 1]},
+    ])
+    def test_if_cursor_values_are_invalid_returns_404(self, products, cursor):
+        encoded = b64encode(json.dumps(cursor).encode()).decode()
+
+        response = APIClient().get(f'/store/products/?cursor={encoded}')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_cursor_is_for_another_ordering_returns_404(self, products):
+        client = APIClient()
+        next_link = client.get('/store/products/?page_size=4').data['next']
+
+        response = client.get(f'{next_link}&ordering=price')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+    def test_returns_only_the_requested_fields(self, products):
+        response = APIClient().get('/store/products/?fields=id,title,unit_price')
+
+        assert set(response.data['results'][0]) == {'id', 'title', 'unit_price'}
+
+    def test_reviews_are_only_embedded_when_expanded(self, products):
+        client = APIClient()
+
+        assert 'reviews' not in client.get('/store/products/').data['results'][0]
+        assert 'reviews' in client.get('/store/products/?expand=reviews').data['results'][0]
+
+    def test_sparse_list_runs_a_single_query(self, products):
+        with CaptureQueriesContext(connection) as context:
+            APIClient().get('/store/products/?fields=id,title,collection')
+
+        # Plus the conditional GET probe.
+        assert len(context.captured_queries) == 2
+
+
+@pytest.mark.django_db
+class TestSearchProducts:
+    @pytest.fixture
+    def catalog(self):
+        collection = Collection.objects.create(title='a')
+        def create(title, description=''):
+            return Product.objects.create(
+                title=title, description=description, unit_price=10, inventory=1, collection=collection)
+        return create
+
+    def test_ranks_title_matches_first(self, catalog):
+        in_description = catalog('lamp', 'a desk for the office')
+        in_title = catalog('office desk', '')
+        catalog('chair', 'comfortable')
+
+        response = APIClient().get('/store/products/?search=desk')
+
+        assert [product['id'] for product in response.data['results']] == [in_title.id, in_description.id]
+
+    def test_index_follows_updates(self, catalog):
+        product = catalog('chair')
+        product.title = 'stool'
+        product.save()
+
+        client = APIClient()
+
+        assert client.get('/store/products/?search=chair').data['results'] == []
+        assert len(client.get('/store/products/?search=stool').data['results']) == 1
+
+    def test_pages_cover_every_match_once(self, catalog):
+        products = [catalog(f'desk {index}', 'desk' * (index % 3)) for index in range(9)]
+        client = APIClient()
+        url = '/store/products/?search=desk&page_size=2'
+        ids = []
+
+        while url:
+            response = client.get(url)
+            ids += [product['id'] for product in response.data['results']]
+            url = response.data['next']
+
+        assert sorted(ids) == [product.id for product in products]
+
+    def test_query_syntax_is_not_interpreted(self, catalog):
+        catalog('desk')
+
+        response = APIClient().get('/store/products/?search=desk"* (')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 1
+
+    def test_query_without_terms_matches_nothing(self, catalog):
+        catalog('desk')
+
+        response = APIClient().get('/store/products/?search=!!&facets=true')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == []
+
+
+@pytest.mark.django_db
+class TestFilterProducts:
+    @pytest.fixture
+    def catalog(self):
+        lamps, desks = Collection.objects.bulk_create([Collection(title='lamps'), Collection(title='desks')])
+        promotion = Promotion.objects.create(description='sale', discount=0.1)
+        products = Product.objects.bulk_create([
+            Product(title='a', description='', unit_price=10, inventory=0, collection=lamps),
+            Product(title='b', description='', unit_price=30, inventory=5, collection=lamps),
+            Product(title='c', description='', unit_price=200, inventory=5, collection=desks),
+        ])
+        Product.objects.refresh_effective_prices()
+        products[1].promotions.add(promotion)
+        return SimpleNamespace(lamps=lamps, desks=desks, products=products)
+
+    def get_ids(self, url):
+        return [product['id'] for product in APIClient().get(url).data['results']]
+
+    def test_filters_combine(self, catalog):
+        a, b, c = catalog.products
+
+        assert self.get_ids(f'/store/products/?collection={catalog.lamps.id}&in_stock=true') == [b.id]
+        assert self.get_ids('/store/products/?min_price=20&max_price=250') == [b.id, c.id]
+        assert self.get_ids('/store/products/?on_promotion=true') == [b.id]
+        assert self.get_ids('/store/products/?in_stock=false') == [a.id]
+
+    def test_if_price_is_invalid_returns_400(self, catalog):
+        response = APIClient().get('/store/products/?min_price=cheap')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'min_price' in response.data
+
+    def test_facets_keep_every_collection_and_count_the_selected_ones(self, catalog):
+        url = f'/store/products/?collection={catalog.lamps.id}&facets=true&fields=id'
+
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(url)
+        queries = len(context.captured_queries)
+
+        facets = response.data['facets']
+        # Page, facets and the conditional GET probe.
+        assert queries == 3
+        assert [(item['title'], item['count']) for item in facets['collection']] == [('desks', 1), ('lamps', 2)]
+        assert [bucket['count'] for bucket in facets['price']] == [1, 1, 0, 0]
+        assert facets['in_stock'] == 1
+        assert facets['on_promotion'] == 1
+
+
+@pytest.mark.django_db
+class TestEffectivePrice:
+    def get_price(self, product):
+        return Product.objects.get(pk=product.pk).effective_price
+
+    def test_includes_tax_rounded_to_cents(self, product):
+        assert self.get_price(product) == Decimal('11.90')
+
+    def test_follows_unit_price(self, product):
+        product.unit_price = 20
+        product.save()
+
+        assert self.get_price(product) == Decimal('23.80')
+
+    def test_applies_the_best_promotion(self, product):
+        small = Promotion.objects.create(description='small', discount=0.1)
+        big = Promotion.objects.create(description='big', discount=0.5)
+
+        product.promotions.add(small, big)
+        assert self.get_price(product) == Decimal('5.95')
+
+        big.discount = 0.2
+        big.save()
+        assert self.get_price(product) == Decimal('9.52')
+
+        big.delete()
+        assert self.get_price(product) == Decimal('10.71')
+
+        small.product_set.clear()
+        assert self.get_price(product) == Decimal('11.90')
+
+    def test_orders_by_price(self, product):
+        cheap = Product.objects.create(
+            title='z', description='', unit_price=5, inventory=1, collection=product.collection)
+
+        response = APIClient().get('/store/products/?ordering=price')
+
+        assert [item['id'] for item in response.data['results']] == [cheap.id, product.id]
+        assert response.data['results'][0]['price_with_tax'] == Decimal('5.95')
+
+
+@pytest.mark.django_db
+class TestContentNegotiation:
+    def test_returns_messagepack_when_accepted(self, product):
+        response = APIClient().get('/store/products/', HTTP_ACCEPT='application/msgpack')
+
+        assert response['Content-Type'] == 'application/msgpack'
+        assert msgpack.unpackb(response.content)['results'][0]['price_with_tax'] == 11.9
+
+    def test_parses_messagepack_requests(self, product):
+        body = msgpack.packb({'name': 'a', 'description': 'great'})
+
+        response = APIClient().post(
+            f'/store/products/{product.id}/reviews/', body, content_type='application/msgpack')
+
+        assert response.status_code == 201
+        assert response.data['name'] == 'a'
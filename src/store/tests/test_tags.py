@@ -0,0 +1,55 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+import pytest
+
+from store.models import Collection, Product
+from tags.models import Tag, TaggedItem
+
+
+@pytest.fixture
+def catalog():
+    collection = Collection.objects.create(title='a')
+    products = [
+        Product.objects.create(title=f'product {index}', description='', unit_price=10, inventory=1, collection=collection)
+        for index in range(3)
+    ]
+    red, blue = Tag.objects.create(label='red'), Tag.objects.create(label='blue')
+    product_type = ContentType.objects.get_for_model(Product)
+    for product, tag in [(products[0], red), (products[0], blue), (products[1], red)]:
+        TaggedItem.objects.create(tag=tag, content_type=product_type, object_id=product.id)
+    return products, red, blue
+
+
+@pytest.mark.django_db
+class TestProductTags:
+    def test_get_tags_for_many_runs_one_query(self, catalog):
+        products, red, blue = catalog
+
+        with CaptureQueriesContext(connection) as context:
+            tags = TaggedItem.objects.get_tags_for_many(Product, [product.id for product in products])
+        queries = len(context.captured_queries)
+
+        assert queries == 1
+        assert tags == {products[0].id: [blue, red], products[1].id: [red], products[2].id: []}
+
+    def test_tags_are_only_embedded_when_expanded(self, catalog):
+        client = APIClient()
+
+        assert 'tags' not in client.get('/store/products/').data['results'][0]
+
+        results = client.get('/store/products/?expand=tags').data['results']
+        assert [[tag['label'] for tag in product['tags']] for product in results] == [['blue', 'red'], ['red'], []]
+
+    def test_lists_products_by_tag(self, catalog):
+        products, red, _ = catalog
+
+        response = APIClient().get(f'/tags/{red.id}/products/')
+
+        assert [product['id'] for product in response.data['results']] == [products[0].id, products[1].id]
+
+    def test_lists_tags(self, catalog):
+        response = APIClient().get('/tags/')
+
+        assert [tag['label'] for tag in response.data] == ['blue', 'red']
@@ -0,0 +1,84 @@
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+from PIL import Image, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+
+from .validators import MAX_IMAGE_DIMENSION, MAX_IMAGE_SIZE_KB
+
+
+# Room for the multipart boundaries and the other form fields.
+MULTIPART_OVERHEAD = 16 * 1024
+
+HEADER_SIZE = 12
+
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+]
+
+
+def sniff_image_format(header):
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    for signature, format in SIGNATURES:
+        if header.startswith(signature):
+            return format
+    return None
+
+
+def invalid_image(message):
+    return ValidationError({'image': [message]})
+
+
+class ImageUploadHandler(MemoryFileUploadHandler):
+    # Checks an image upload while it streams in: the request is rejected as
+    # soon as it passes the size limit or its first bytes are not a known
+    # image format, and the dimensions are read from the header only.
+    max_size = MAX_IMAGE_SIZE_KB * 1024
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length is not None and content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise self.too_large()
+        # Anything accepted fits in memory, whatever FILE_UPLOAD_MAX_MEMORY_SIZE is.
+        self.activated = True
+
+    def new_file(self, *args, **kwargs):
+        self.format = None
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            raise self.too_large()
+        super().receive_data_chunk(raw_data, start)
+        if self.format is None and self.file.tell() >= HEADER_SIZE:
+            self.sniff()
+
+    def file_complete(self, file_size):
+        if self.format is None:
+            self.sniff()
+        file = super().file_complete(file_size)
+
+        try:
+            # open() only parses the header, the pixels are never decoded.
+            image = Image.open(file)
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise invalid_image('Upload a valid image. The file you uploaded was either not an image or a corrupted image.')
+        if image.format != self.format:
+            raise invalid_image('The file content does not match its image format.')
+        if max(image.size) > MAX_IMAGE_DIMENSION:
+            raise invalid_image(f'Images cannot be larger than {MAX_IMAGE_DIMENSION}px on either side.')
+
+        file.seek(0)
+        # Read by SniffedImageField instead of opening the file again.
+        file.image = image
+        file.content_type = Image.MIME.get(image.format)
+        return file
+
+    def sniff(self):
+        self.format = sniff_image_format(self.file.getvalue()[:HEADER_SIZE])
+        if self.format is None:
+            raise invalid_image('Only JPEG, PNG, GIF and WebP images are supported.')
+
+    def too_large(self):
+        return invalid_image(f'Files cannot be larger than {MAX_IMAGE_SIZE_KB} KB!!')
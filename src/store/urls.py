@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 
 urlpatterns = [
@@ -7,7 +7,7 @@ urlpatterns = [
     path('products/<int:pk>/', views.ProductDetails.as_view()),
     path('collections/', views.CollectionList.as_view()),
     path('collections/<int:pk>/', views.CollectionDetails.as_view(), name='collection-details'),
-    path('products/<int:product_pk>/reviews/', views.ReviewList.as_view()),
+    path('products/<int:product_pk>/reviews/', views.ReviewList.as_view(), name='review-list'),
     path('products/<int:product_pk>/reviews/<int:pk>/', views.ReviewDetails.as_view()),
     path('carts/', views.CartAdd.as_view()),
     path('carts/<int:pk>/', views.CartDetails.as_view()),
@@ -17,7 +17,17 @@ urlpatterns = [
     path('customers/<int:pk>/', views.CustomerDetails.as_view()),
     path('customers/me/', views.CurrentCustomer.as_view()),
     path('orders/', views.OrderList.as_view()),
+    path('orders/batch/', views.OrderBatch.as_view()),
     path('orders/<int:pk>/', views.OrderDetails.as_view()),
     path('products/<int:product_pk>/images/', views.ProductImageList.as_view()),
     path('products/<int:product_pk>/images/<int:pk>/', views.ProductImageDetails.as_view()),
-]
\ No newline at end of file
+    # Async versions of the catalog reads, for ASGI deployments.
+    path('async/products/', async_views.ProductList.as_view()),
+    path('async/products/<int:pk>/', async_views.ProductDetails.as_view()),
+    path('async/collections/', async_views.CollectionList.as_view()),
+    path('async/collections/<int:pk>/', async_views.CollectionDetails.as_view()),
+    path('async/products/<int:product_pk>/reviews/', async_views.ReviewList.as_view()),
+    path('async/products/<int:product_pk>/reviews/<int:pk>/', async_views.ReviewDetails.as_view()),
+    path('async/products/<int:product_pk>/images/', async_views.ProductImageList.as_view()),
+    path('async/products/<int:product_pk>/images/<int:pk>/', async_views.ProductImageDetails.as_view()),
+]
@@ -1,7 +1,12 @@
 from django.core.exceptions import ValidationError
 
+MAX_IMAGE_SIZE_KB = 50
+
+# Longest side accepted for a product image, in pixels.
+MAX_IMAGE_DIMENSION = 4000
+
 def validate_file_size(file):
-    max_size_kb = 50
+    max_size_kb = MAX_IMAGE_SIZE_KB
 
     if file.size > max_size_kb * 1024:
-        raise ValidationError(f"Files cannot be larger than {max_size_kb} KB!!")
\ No newline at end of file
+        raise ValidationError(f"Files cannot be larger than {max_size_kb} KB!!")
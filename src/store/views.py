@@ -1,15 +1,23 @@
 from django.shortcuts import get_object_or_404
-from django.db.models import Count
+from django.db.models import Count, F, Max, Prefetch, Sum
 
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, CreateAPIView, RetrieveDestroyAPIView, RetrieveUpdateAPIView
-from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
-
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny, SAFE_METHODS
+from rest_framework.filters import OrderingFilter
+
+from .cache import CachedResponseMixin, ConditionalResponseMixin
+from .filters import ProductFilter
+from .customers import get_customer, get_customer_id
+from .pagination import KeysetPagination, OrderPagination
+from .search import get_search_terms, search_products
+from .uploadhandlers import ImageUploadHandler
 from .models import Product, Collection, Review, Cart, Order, CartItem, OrderItem, Customer, ProductImage
-from .serializers import ProductSerializer, CollectionSerializer, ReviewSerializer, CartSerializer, CartItemSerializer, AddCartItemSerializer, UpdateCartItemSerializer, CustomerSerializer, OrderSerializer, OrderItemSerializer, CreateOrderSerializer, UpdateOrderSerializer, ProductImageSerializer
+from .serializers import BatchCreateOrderSerializer, CartSummarySerializer, is_summary, OrderSummarySerializer, get_product_serializer, CollectionSerializer, ReviewSerializer, CartSerializer, CartItemSerializer, AddCartItemSerializer, UpdateCartItemSerializer, CustomerSerializer, OrderSerializer, OrderItemSerializer, CreateOrderSerializer, UpdateOrderSerializer, ProductImageSerializer
 
 
 # @api_view(['GET', 'POST'])
@@ -114,13 +122,17 @@ from .serializers import ProductSerializer, CollectionSerializer, ReviewSerializ
 
 #         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class CollectionList(ListCreateAPIView):
+class CollectionList(ConditionalResponseMixin, CachedResponseMixin, ListCreateAPIView):
+    cache_dependencies = ['collection', 'product']
     queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [IsAdminUser]
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['title', 'products_count']
 
-class CollectionDetails(RetrieveUpdateDestroyAPIView):
-    queryset = Collection.objects.annotate(products_count=Count('products')).all()
+class CollectionDetails(ConditionalResponseMixin, CachedResponseMixin, RetrieveUpdateDestroyAPIView):
+    cache_dependencies = ['collection', 'product']
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
 
     def delete(self, request, pk):
@@ -131,16 +143,102 @@ class CollectionDetails(RetrieveUpdateDestroyAPIView):
 
         return Response(status=status.HTTP_204_NO_CONTENT)
     
-class ProductList(ListCreateAPIView):
-    queryset = Product.objects.select_related('collection').prefetch_related('images').all()
-    serializer_class = ProductSerializer
+class ProductQuerysetMixin:
+    latest_reviews_limit = 5
+
+    def get_serializer_class(self):
+        return get_product_serializer()
+
+    @property
+    def cache_dependencies(self):
+        return self.get_serializer_class().cache_dependencies
+
+    def get_queryset(self):
+        queryset = Product.objects.all()
+        serializer_class = self.get_serializer_class()
+        fields = serializer_class.get_selected_fields(self.request)
+
+        if self.request.method in SAFE_METHODS:
+            # Load only what the selected fields render, plus the sort key.
+            sort_key = [field.lstrip('-') for field in getattr(self, 'keyset_ordering', ())]
+            columns = {field.name for field in Product._meta.concrete_fields}.intersection(sort_key)
+            queryset = queryset.only(*columns, *serializer_class.get_only_fields(self.request))
+        if 'images' in fields:
+            queryset = queryset.prefetch_related('images')
+        if 'reviews_count' in fields:
+            queryset = queryset.annotate(reviews_count=Count('reviews'))
+        if 'reviews' in fields:
+            # A sliced Prefetch is resolved with a ROW_NUMBER() window
+            # partitioned by product, so the query stays bounded per product.
+            latest_reviews = Review.objects.order_by('-date', '-id')[:self.latest_reviews_limit]
+            queryset = queryset.prefetch_related(
+                Prefetch('reviews', queryset=latest_reviews, to_attr='latest_reviews'))
+        return queryset
+
+class ProductList(ProductQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, ListCreateAPIView):
+    pagination_class = KeysetPagination
+    filter_backends = [ProductFilter]
+
+    def get_search_query(self):
+        return self.request.query_params.get('search', '').strip()
+
+    # ?ordering= values, each backed by an index.
+    orderings = {
+        'price': ('effective_price', 'id'),
+        '-price': ('-effective_price', '-id'),
+    }
+
+    @property
+    def keyset_ordering(self):
+        ordering = self.request.query_params.get('ordering')
+        if ordering in self.orderings:
+            return self.orderings[ordering]
+        # Search results are ranked, best match first. A query without terms
+        # matches nothing.
+        if get_search_terms(self.get_search_query()):
+            return ('-rank', 'id')
+        return KeysetPagination.ordering
+
+    def get_queryset(self):
+        return self.narrow_queryset(super().get_queryset())
+
+    # The products listed, before the filters. Facets are counted over it.
+    def narrow_queryset(self, queryset):
+        query = self.get_search_query()
+        if query:
+            queryset = search_products(queryset, query)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        facets = self.get_facets(request)
+        if facets is not None:
+            response.data['facets'] = facets
+        return response
+
+    def get_freshness(self, request):
+        # One indexed query over the listed products. The count catches
+        # products leaving the list.
+        probe = ProductFilter().filter_queryset(request, self.narrow_queryset(Product.objects.all()), self) \
+            .aggregate(last_update=Max('last_update'), count=Count('id'))
+        return probe['last_update'], [probe['count']]
+
+    def get_facets(self, request):
+        product_filter = ProductFilter()
+        if not product_filter.get_params(request).get('facets'):
+            return None
+        return product_filter.get_facets(request, self.narrow_queryset(Product.objects.all()))
 
     def get_serializer_context(self):
         return {'request': self.request}
     
-class ProductDetails(RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.select_related('collection').prefetch_related('images').all()
-    serializer_class = ProductSerializer
+class ProductDetails(ProductQuerysetMixin, ConditionalResponseMixin, CachedResponseMixin, RetrieveUpdateDestroyAPIView):
+
+    def get_freshness(self, request):
+        last_update = Product.objects.filter(pk=self.kwargs['pk']).values_list('last_update', flat=True).first()
+        if last_update is None:
+            return None
+        return last_update, []
 
     def delete(self, request, pk):
         product = get_object_or_404(Product, pk=pk)
@@ -150,11 +248,12 @@ class ProductDetails(RetrieveUpdateDestroyAPIView):
 
         return Response(status=status.HTTP_204_NO_CONTENT)
     
-class ReviewList(ListCreateAPIView):
+class ReviewList(CachedResponseMixin, ListCreateAPIView):
+    cache_dependencies = ['review', 'product']
     serializer_class = ReviewSerializer
 
     def get_queryset(self):
-        return Review.objects.filter(product_id=self.kwargs['product_pk'])
+        return Review.objects.filter(product_id=self.kwargs['product_pk']).select_related('product')
 
     def get_serializer_context(self):
         return {"product_id": self.kwargs['product_pk']}
@@ -164,19 +263,27 @@ class ReviewDetails(RetrieveUpdateDestroyAPIView):
     serializer_class = ReviewSerializer
 
     def get_queryset(self):
-        return Review.objects.filter(product_id=self.kwargs['product_pk'])
+        return Review.objects.filter(product_id=self.kwargs['product_pk']).select_related('product')
 
     def get_serializer_context(self):
         return {"product_id": self.kwargs['product_pk']}
     
 
 class CartAdd(CreateAPIView):
-    queryset = Cart.objects.prefetch_related('items__product').all()
+    queryset = Cart.objects.all()
     serializer_class = CartSerializer
 
 class CartDetails(RetrieveDestroyAPIView):
-    queryset = Cart.objects.prefetch_related('items__product').all()
-    serializer_class = CartSerializer
+    def get_queryset(self):
+        queryset = Cart.objects.with_totals()
+        if is_summary(self.request) or 'items' not in CartSerializer.get_selected_fields(self.request):
+            return queryset
+        return queryset.prefetch_related(Prefetch('items', queryset=CartItem.objects.with_total_price()))
+
+    def get_serializer_class(self):
+        if is_summary(self.request):
+            return CartSummarySerializer
+        return CartSerializer
 
 class CartItemsList(ListCreateAPIView):
     def get_serializer_class(self):
@@ -185,7 +292,7 @@ class CartItemsList(ListCreateAPIView):
         return CartItemSerializer
 
     def get_queryset(self):
-        return CartItem.objects.filter(cart_id=self.kwargs['cart_pk']).select_related('product')
+        return CartItem.objects.with_total_price().filter(cart_id=self.kwargs['cart_pk'])
 
     def get_serializer_context(self):
         return {"cart_id": self.kwargs['cart_pk']}
@@ -199,7 +306,7 @@ class CartItemsDetails(RetrieveUpdateDestroyAPIView):
         return CartItemSerializer
     
     def get_queryset(self):
-        return CartItem.objects.filter(cart_id=self.kwargs['cart_pk']).select_related('product')
+        return CartItem.objects.with_total_price().filter(cart_id=self.kwargs['cart_pk'])
 
     def get_serializer_context(self):
         return {"cart_id": self.kwargs['cart_pk']}
@@ -220,62 +327,81 @@ class CustomerDetails(RetrieveUpdateAPIView):
 
 class CurrentCustomer(APIView):
     permission_classes = [IsAuthenticated]
+    def get_customer(self):
+        customer = get_customer(self.request)
+        if customer is None:
+            raise NotFound()
+        return customer
+
     def get(self, request):
-        customer = Customer.objects.get(user_id=request.user.id)
+        customer = self.get_customer()
         serializer = CustomerSerializer(customer)
 
         return Response(serializer.data)
     
     def put(self, request):
-        customer = Customer.objects.get(user_id=request.user.id)
+        customer = self.get_customer()
         serializer = CustomerSerializer(customer, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
         return Response(serializer.data)
     
-class OrderList(ListCreateAPIView):
-    # queryset = Order.objects.all()
-    # serializer_class = OrderSerializer
-    permission_classes = [IsAuthenticated]
-
+class OrderQuerysetMixin:
     def get_queryset(self):
+        queryset = Order.objects.select_related('customer')
+
+        if self.request.method == 'GET' and is_summary(self.request):
+            # Totals are computed by the database, line items are not loaded.
+            queryset = queryset.annotate(
+                items_count=Count('items'),
+                total_price=Sum(F('items__quantity') * F('items__unit_price')),
+            )
+        elif 'items' in OrderSerializer.get_selected_fields(self.request):
+            queryset = queryset.prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('product')))
+
         user = self.request.user
         if user.is_staff:
-            return Order.objects.all()
+            return queryset
         
-        customer_id = Customer.objects.only('id').get(user_id=user.id)
-        return Order.objects.filter(customer_id=customer_id)
+        return queryset.filter(customer_id=get_customer_id(self.request))
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and is_summary(self.request):
+            return OrderSummarySerializer
+        return OrderSerializer
+
+class OrderList(OrderQuerysetMixin, ListCreateAPIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = OrderPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return CreateOrderSerializer
-        return OrderSerializer
+        return super().get_serializer_class()
     
     def create(self, request, *args, **kwargs):
-        serializer = CreateOrderSerializer(data=request.data, context={"user_id": self.request.user.id})
+        serializer = CreateOrderSerializer(data=request.data, context={"customer_id": get_customer_id(request)})
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
+        order = self.get_queryset().get(pk=order.pk)
         serializer = OrderSerializer(order)
         
         return Response(serializer.data)
-    
-    # def get_serializer_context(self):
-    #     return {"user_id": self.request.user.id}
 
-class OrderDetails(RetrieveUpdateDestroyAPIView):
-    http_method_names = ['get', 'patch', 'delete', 'head', 'options']
-    # queryset = Order.objects.all()
-    # serializer_class = OrderSerializer
-    # permission_classes = [IsAuthenticated]
+class OrderBatch(APIView):
+    permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_staff:
-            return Order.objects.all()
-        
-        customer_id = Customer.objects.only('id').get(user_id=user.id)
-        return Order.objects.filter(customer_id=customer_id)
+    def post(self, request):
+        serializer = BatchCreateOrderSerializer(data=request.data, context={"customer_id": get_customer_id(request)})
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        return Response({"results": results})
+
+class OrderDetails(OrderQuerysetMixin, RetrieveUpdateDestroyAPIView):
+    http_method_names = ['get', 'patch', 'delete', 'head', 'options']
     
     def get_permissions(self):
         if self.request.method in ['PATCH', 'DELETE']:
@@ -285,10 +411,18 @@ class OrderDetails(RetrieveUpdateDestroyAPIView):
     def get_serializer_class(self):
         if self.request.method == 'PATCH':
             return UpdateOrderSerializer
-        return OrderSerializer
+        return super().get_serializer_class()
     
 
-class ProductImageList(ListCreateAPIView):
+class ImageUploadMixin:
+    def initialize_request(self, request, *args, **kwargs):
+        # Must be set before anything reads the request body.
+        if request.method in ('POST', 'PUT', 'PATCH'):
+            request.upload_handlers = [ImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+
+class ProductImageList(ImageUploadMixin, ListCreateAPIView):
     serializer_class = ProductImageSerializer
 
     def get_queryset(self):
@@ -298,7 +432,7 @@ class ProductImageList(ListCreateAPIView):
         return {"product_id": self.kwargs["product_pk"]}
     
 
-class ProductImageDetails(RetrieveUpdateDestroyAPIView):
+class ProductImageDetails(ImageUploadMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = ProductImageSerializer
 
     def get_queryset(self):
@@ -12,7 +12,6 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 import os
 from pathlib import Path
-from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -49,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -133,15 +133,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
+    # request.user is built from the token claims, without a user query.
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.JWTClaimsAuthentication',
+    ),
+    # orjson for JSON, and MessagePack for the mobile apps
+    # (Accept: application/msgpack).
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.ORJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
 }
 
 SIMPLE_JWT = {
    'AUTH_HEADER_TYPES': ('JWT',),
+   # Access tokens carry is_staff and customer_id, see core.tokens.
+   'TOKEN_OBTAIN_SERIALIZER': 'core.serializers.TokenObtainPairSerializer',
+   'TOKEN_REFRESH_SERIALIZER': 'core.serializers.TokenRefreshSerializer',
 }
 
+# User fields cached by core.authentication.ClaimsUser, without the password.
+CORE_USER_CACHE_TIMEOUT = 60
+
 DJOSER = {
     'SERIALIZERS': {
         'user_create': 'core.serializers.UserCreateSerializer',
@@ -151,14 +171,23 @@ DJOSER = {
 
 CELERY_BROKER_URL = 'redis://localhost/6379/1'
 
-CELERY_BEAT_SCHEDULE = {
-    'notify_customers': {
-        'tasks': 'playground.tasks.notify_customers',
-        'schedule': crontab(minute='*/15'),
-        'args': ['Hello World!!']
-    }
+# Nothing is scheduled. playground.tasks.notify_customers emails every
+# customer, so it is only queued on purpose, with a real message.
+CELERY_BEAT_SCHEDULE = {}
+
+# Each send_notifications subtask holds one SMTP connection.
+CELERY_TASK_ANNOTATIONS = {
+    'playground.tasks.send_notifications': {'rate_limit': '30/m'},
 }
 
+# smtp4dev from docker-compose.yml, listening on port 25.
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = 'localhost'
+EMAIL_PORT = 25
+EMAIL_HOST_USER = ''
+EMAIL_HOST_PASSWORD = ''
+DEFAULT_FROM_EMAIL = 'store@example.com'
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -167,4 +196,33 @@ CACHES = {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
         }
     }
-}
\ No newline at end of file
+}
+
+# Upstream of playground.views.say_hello, fetched through core.fetch.cached_fetch
+PLAYGROUND_HELLO_URL = 'https://httpbin.org/delay/2'
+
+# Product representation of the store's views, with the tags from core.
+STORE_PRODUCT_SERIALIZER = 'core.serializers.TaggedProductSerializer'
+
+# Catalog responses cached by store.cache.CachedResponseMixin
+STORE_RESPONSE_CACHE_TIMEOUT = 10 * 60
+
+STORE_RESPONSE_CACHE_MAX_SIZE = 512 * 1024
+
+# User id to customer id, see store.customers.get_customer_id. 0 disables it.
+STORE_CUSTOMER_CACHE_TIMEOUT = 60 * 60
+
+# Per-request query logging by core.middleware.QueryInstrumentationMiddleware
+QUERY_SLOW_REQUEST_MS = 500
+
+# Sends the query count and database time to the client in a Server-Timing
+# header, for development only.
+QUERY_SERVER_TIMING = False
+
+# Executions of the same SQL within one request that are logged as an N+1.
+QUERY_REPEAT_THRESHOLD = 10
+
+QUERY_LOG_TOP = 5
+
+# Runs EXPLAIN on the logged SELECTs, one more query each.
+QUERY_LOG_EXPLAIN = False
@@ -0,0 +1,41 @@
+from .common import *
+
+# The tests sign JWTs with this key, PyJWT warns about HMAC keys shorter
+# than 32 bytes.
+SECRET_KEY = 'django-insecure-test-only-not-for-production-use'
+
+DEBUG = False
+
+# SQLite and a local-memory cache keep the test and benchmark runs
+# self-contained: pytest --ds=storefront.settings.test
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        # A file, not shared-cache memory, and IMMEDIATE transactions, so
+        # that the concurrency tests' threads wait on the busy timeout
+        # instead of failing on table locks.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+# Tasks run in-process, so image renditions are generated without a broker.
+CELERY_TASK_ALWAYS_EAGER = True
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
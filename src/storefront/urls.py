@@ -26,7 +26,6 @@ admin.site.index_title='Yannick Admin'
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
-    path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.jwt')),
     path('store/', include('store.urls')),
     path('playground/', include('playground.urls')),
@@ -9,6 +9,18 @@ class TaggItemManager(models.Manager):
 
         return TaggedItem.objects.select_related('tag').filter(content_type=content_type, object_id=obj_id)
 
+    def get_tags_for_many(self, obj_type, obj_ids):
+        # {object id: [tags]} for many objects of one type, in one query.
+        content_type = ContentType.objects.get_for_model(obj_type)
+        tags = {obj_id: [] for obj_id in obj_ids}
+
+        items = TaggedItem.objects.select_related('tag') \
+            .filter(content_type=content_type, object_id__in=tags) \
+            .order_by('tag__label', 'tag_id')
+        for item in items:
+            tags[item.object_id].append(item.tag)
+        return tags
+
 class Tag(models.Model):
     label = models.CharField(max_length=255)
 
@@ -30,3 +42,10 @@ class TaggedItem(models.Model):
      # ID
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
+
+    class Meta:
+        indexes = [
+            # Tags of given objects, and objects with a given tag.
+            models.Index(fields=['content_type', 'object_id']),
+            models.Index(fields=['tag', 'content_type', 'object_id']),
+        ]
@@ -3,5 +3,5 @@ from . import views
 
 
 urlpatterns = [
-
-]
\ No newline at end of file
+    path('', views.TagList.as_view(), name='tag-list'),
+]
@@ -1,3 +1,9 @@
-from django.shortcuts import render
+from rest_framework.generics import ListAPIView
 
-# Create your views here.
+from .models import Tag
+from .serializers import TagSerializer
+
+
+class TagList(ListAPIView):
+    queryset = Tag.objects.all()
+    serializer_class = TagSerializer